@@ -1,9 +1,12 @@
 import google.generativeai as genai
+import hashlib
 import json
 import os
+from django.core.cache import cache
 from dotenv import load_dotenv
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 # from langchain.chat_models import ChatOpenAI
 # from langchain.schema import AIMessage, HumanMessage, SystemMessage
 # from langchain.memory import ConversationBufferMemory
@@ -19,6 +22,35 @@ genai.configure(api_key=API_KEY)
 # Initialize the model
 model = genai.GenerativeModel("gemini-2.5-flash")
 
+# AI results depend only on the input schema, so repeat uploads are served from cache
+AI_CACHE_TIMEOUT = 60 * 60 * 24
+
+def schema_cache_key(prefix, schema_details, *extra):
+    """
+    Build a cache key for AI results from the SHA-256 of the schema's canonical JSON.
+    
+    Args:
+        prefix (str): Namespace for the cached result
+        schema_details (dict): The schema dictionary the result was derived from
+        *extra: Any other inputs the result depends on (e.g. a chosen domain)
+        
+    Returns:
+        str: Cache key
+    """
+    canonical = json.dumps([schema_details, *extra], sort_keys=True, default=str)
+    return f"ai:{prefix}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+def note_fallback(fallbacks, source):
+    """
+    Record that an AI call had to fall back to a default result.
+    
+    Args:
+        fallbacks (list): Collects the names of calls that fell back, or None to ignore
+        source (str): Name of the call that fell back
+    """
+    if fallbacks is not None:
+        fallbacks.append(source)
+
 def generate_text(prompt, max_retries=3, delay=1):
     """
     Generates text using Google's Gemini AI model with the given prompt.
@@ -192,18 +224,22 @@ def describe_schema(schema_details):
         description += "\n"
     return description
 
-def detect_domain_with_ai(schema_details):
+# Domains the AI may classify a schema into
+DOMAINS = ['E-commerce', 'Healthcare', 'Finance', 'Education', 'Supply Chain', 'Social Media', 'Retail', 'Logistics', 'Telecommunications',  'Hospitality', 'Insurance', 'Banking', 'Real Estate', 'Other']
+
+def detect_domain_with_ai(schema_details, fallbacks=None):
     """
     Detect the domain of a database schema using AI.
     
     Args:
         schema_details (dict): The schema dictionary with tables and columns
+        fallbacks (list): Optional list that records this call if it falls back
         
     Returns:
         str: The detected domain name or 'Unknown Domain'
     """
     schema_description = describe_schema(schema_details)
-    domains = ['E-commerce', 'Healthcare', 'Finance', 'Education', 'Supply Chain', 'Social Media', 'Retail', 'Logistics', 'Telecommunications',  'Hospitality', 'Insurance', 'Banking', 'Real Estate', 'Other']
+    domains = DOMAINS
     domains_list = '\n- '.join([''] + domains)
     
     prompt = (
@@ -224,9 +260,8 @@ def detect_domain_with_ai(schema_details):
             for domain in domains:
                 if domain.lower() == match.group(1).lower():
                     return domain
-        return 'Unknown Domain'
-    else:
-        return 'Unknown Domain'
+    note_fallback(fallbacks, 'detect_domain_with_ai')
+    return 'Unknown Domain'
 
 def map_names_with_ai(names_list, domain, name_type='table'):
     """
@@ -270,13 +305,14 @@ def map_names_with_ai(names_list, domain, name_type='table'):
 
     return mapping
 
-def suggest_missing_elements(schema_details, domain):
+def suggest_missing_elements(schema_details, domain, fallbacks=None):
     """
     Suggest missing tables or columns for the given domain's database schema using AI.
     
     Args:
         schema_details (dict): The schema dictionary with tables and columns
         domain (str): The domain context for suggestions
+        fallbacks (list): Optional list that records this call if it falls back
         
     Returns:
         dict: Suggestions for missing tables and columns
@@ -313,6 +349,8 @@ def suggest_missing_elements(schema_details, domain):
     
     # Use robust JSON parsing
     suggestions = parse_ai_json_response(suggestions_response, fallback_suggestions)
+    if suggestions is fallback_suggestions or not suggestions_response:
+        note_fallback(fallbacks, 'suggest_missing_elements')
     
     # Ensure required keys exist
     if "missing_tables" not in suggestions:
@@ -322,13 +360,76 @@ def suggest_missing_elements(schema_details, domain):
 
     return suggestions
 
-def generate_warehouse_schema_with_ai(schema_details, domain):
+def analyze_schema(schema_details, fallbacks=None):
+    """
+    Detect the domain of a schema and suggest its missing elements with a single AI call.
+    
+    Combines detect_domain_with_ai and suggest_missing_elements into one prompt, falling
+    back to the two separate calls if the combined response can't be used.
+    
+    Args:
+        schema_details (dict): The schema dictionary with tables and columns
+        fallbacks (list): Optional list that records any of the calls that fall back
+        
+    Returns:
+        dict: 'domain', 'missing_tables' and 'missing_columns'
+    """
+    schema_description = describe_schema(schema_details)
+    domains_list = '\n- '.join([''] + DOMAINS)
+    
+    prompt = (
+        f"You are a database architect.\n\n"
+        f"Analyze this database schema:\n{schema_description}\n\n"
+        f"1. Select the most appropriate domain from this list:{domains_list}\n"
+        f"2. List the critical tables or columns that are missing and would be standard for a database in that domain.\n\n"
+        f"Respond with ONLY a JSON object with this exact format:\n"
+        f"{{\n"
+        f"  \"domain\": \"exact domain name from the list\",\n"
+        f"  \"missing_tables\": [\n"
+        f"    {{\n"
+        f"      \"name\": \"table_name\",\n"
+        f"      \"purpose\": \"brief description\"\n"
+        f"    }}\n"
+        f"  ],\n"
+        f"  \"missing_columns\": [\n"
+        f"    {{\n"
+        f"      \"table\": \"existing_table_name\",\n"
+        f"      \"name\": \"column_name\",\n"
+        f"      \"type\": \"data_type\",\n"
+        f"      \"purpose\": \"brief description\"\n"
+        f"    }}\n"
+        f"  ]\n"
+        f"}}"
+    )
+    
+    analysis = parse_ai_json_response(generate_text(prompt), {})
+    if not isinstance(analysis, dict):
+        analysis = {}
+    
+    # Match the domain case-insensitively against the allowed list
+    detected = str(analysis.get('domain', '')).strip().lower()
+    domain = next((d for d in DOMAINS if d.lower() == detected), None)
+    if domain is None:
+        print("Combined schema analysis failed, falling back to separate AI calls")
+        domain = detect_domain_with_ai(schema_details, fallbacks=fallbacks)
+        suggestions = suggest_missing_elements(schema_details, domain, fallbacks=fallbacks)
+    else:
+        suggestions = analysis
+    
+    return {
+        'domain': domain,
+        'missing_tables': suggestions.get('missing_tables', []),
+        'missing_columns': suggestions.get('missing_columns', []),
+    }
+
+def generate_warehouse_schema_with_ai(schema_details, domain, fallbacks=None):
     """
     Generate a warehouse schema with multiple fact tables and dimension tables using AI based on the user's schema and the domain.
     
     Args:
         schema_details (dict): The original schema dictionary with tables and columns
         domain (str): The domain context for enhancement
+        fallbacks (list): Optional list that records this call if it falls back
         
     Returns:
         dict: Warehouse schema with multiple fact tables and supporting dimension tables
@@ -478,6 +579,8 @@ def generate_warehouse_schema_with_ai(schema_details, domain):
     
     # Use robust JSON parsing
     enhanced_schema = parse_ai_json_response(enhanced_schema_response, fallback_warehouse_schema)
+    if enhanced_schema is fallback_warehouse_schema:
+        note_fallback(fallbacks, 'generate_warehouse_schema_with_ai')
     
     # Check if AI returned malformed structure and fix it
     if 'fact_table_name' in enhanced_schema and 'columns' in enhanced_schema:
@@ -502,13 +605,14 @@ def generate_warehouse_schema_with_ai(schema_details, domain):
     print(f"Successfully parsed AI warehouse schema with {len(enhanced_schema)} tables")
     return enhanced_schema
 
-def generate_full_detailed_ai_warehouse(schema_details, domain):
+def generate_full_detailed_ai_warehouse(schema_details, domain, fallbacks=None):
     """
     Generate a comprehensive, full-scale data warehouse with multiple fact tables, dimension tables, and advanced analytics structures.
     
     Args:
         schema_details (dict): The original schema dictionary with tables and columns
         domain (str): The domain context for enhancement
+        fallbacks (list): Optional list that records this call if it falls back
         
     Returns:
         dict: Comprehensive data warehouse schema with multiple fact tables, dimensions, and analytics structures
@@ -726,6 +830,8 @@ def generate_full_detailed_ai_warehouse(schema_details, domain):
     
     # Use robust JSON parsing with comprehensive fallback
     enhanced_schema = parse_ai_json_response(enhanced_schema_response, fallback_enterprise_schema)
+    if enhanced_schema is fallback_enterprise_schema:
+        note_fallback(fallbacks, 'generate_full_detailed_ai_warehouse')
     
     print(f"Successfully parsed full detailed AI warehouse with {len(enhanced_schema)} tables")
     return enhanced_schema
@@ -741,24 +847,33 @@ def generate_ai_suggestions(schema_details):
     Returns:
         dict: Contains warehouse_schema, ai_enhanced_schema, domain, and other AI suggestions
     """
+    cache_key = schema_cache_key('suggestions', schema_details)
+    cached_result = cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
+    # Names of the AI calls that fell back to a default result
+    fallbacks = []
     try:
-        # Detect domain
-        domain = detect_domain_with_ai(schema_details)
+        # Detect domain and missing elements in one call
+        missing_elements = analyze_schema(schema_details, fallbacks=fallbacks)
+        domain = missing_elements['domain']
         if not domain or domain.lower() in ['unknown', 'general', '']:
             domain = "general business"
         
         print(f"Detected domain: {domain}")
         
-        # Generate warehouse schema
-        warehouse_schema = generate_warehouse_schema_with_ai(schema_details, domain)
-        
-        # Generate AI enhanced schema (more comprehensive)
-        ai_enhanced_schema = generate_full_detailed_ai_warehouse(schema_details, domain)
-        
-        # Generate additional suggestions
-        missing_elements = suggest_missing_elements(schema_details, domain)
+        # The two schema generations only depend on the domain, so run them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Generate warehouse schema
+            warehouse_future = executor.submit(generate_warehouse_schema_with_ai, schema_details, domain, fallbacks)
+            # Generate AI enhanced schema (more comprehensive)
+            ai_enhanced_future = executor.submit(generate_full_detailed_ai_warehouse, schema_details, domain, fallbacks)
+            
+            warehouse_schema = warehouse_future.result()
+            ai_enhanced_schema = ai_enhanced_future.result()
         
-        return {
+        result = {
             'domain': domain,
             'warehouse_schema': warehouse_schema,
             'ai_enhanced_schema': ai_enhanced_schema,
@@ -771,6 +886,12 @@ def generate_ai_suggestions(schema_details):
                 'recommendations': f"Based on {domain} industry best practices, we've created a comprehensive data warehouse design."
             }
         }
+        # Only runs where every AI call succeeded are cached, so failures are retried on the next upload
+        if fallbacks:
+            print(f"Not caching AI suggestions, these calls fell back: {', '.join(fallbacks)}")
+        else:
+            cache.set(cache_key, result, AI_CACHE_TIMEOUT)
+        return result
         
     except Exception as e:
         print(f"Error in generate_ai_suggestions: {e}")
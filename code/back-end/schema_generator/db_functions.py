@@ -0,0 +1,28 @@
+# schema_generator/db_functions.py
+
+from django.db.models import Func, IntegerField
+
+
+class JSONKeyCount(Func):
+    """
+    Count the top-level entries of a JSON column inside the database.
+
+    Equivalent to len() on the decoded value (keys for an object, elements
+    for an array) without loading the JSON document into Python.
+    """
+    output_field = IntegerField()
+    # SQLite: json_each yields one row per key/element
+    template = '(SELECT COUNT(*) FROM json_each(%(expressions)s))'
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template=(
+                "(CASE jsonb_typeof(%(expressions)s) "
+                "WHEN 'object' THEN (SELECT COUNT(*) FROM jsonb_object_keys(%(expressions)s)) "
+                "WHEN 'array' THEN jsonb_array_length(%(expressions)s) "
+                "ELSE 0 END)"
+            ),
+            **extra_context
+        )
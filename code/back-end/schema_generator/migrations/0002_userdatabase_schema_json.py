@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schema_generator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdatabase',
+            name='ai_enhanced_schema_json',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userdatabase',
+            name='original_schema_json',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userdatabase',
+            name='warehouse_schema_json',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
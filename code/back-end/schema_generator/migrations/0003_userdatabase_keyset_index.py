@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schema_generator', '0002_userdatabase_schema_json'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userdatabase',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='userdb_user_created_id_idx'),
+        ),
+    ]
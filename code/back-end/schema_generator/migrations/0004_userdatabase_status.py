@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schema_generator', '0003_userdatabase_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdatabase',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 09:34
+
+from django.db import migrations, models
+
+
+def overall_scores(evaluation_results):
+    # Frozen copy of models.overall_scores as of this migration
+    if not evaluation_results:
+        return None, None
+    return (
+        evaluation_results.get('warehouse_schema_evaluation', {}).get('overall_score', 0),
+        evaluation_results.get('ai_enhanced_schema_evaluation', {}).get('overall_score', 0),
+    )
+
+
+def populate_scores(apps, schema_editor):
+    UserDatabase = apps.get_model('schema_generator', 'UserDatabase')
+    for user_db in UserDatabase.objects.filter(evaluation_results__isnull=False).only('evaluation_results').iterator():
+        user_db.warehouse_score, user_db.ai_enhanced_score = overall_scores(user_db.evaluation_results)
+        user_db.save(update_fields=['warehouse_score', 'ai_enhanced_score'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schema_generator', '0004_userdatabase_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdatabase',
+            name='ai_enhanced_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userdatabase',
+            name='warehouse_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schema_generator', '0005_userdatabase_scores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userdatabase',
+            index=models.Index(fields=['user', 'domain', '-created_at', '-id'], name='userdb_user_domain_idx'),
+        ),
+    ]
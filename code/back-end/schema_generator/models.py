@@ -1,6 +1,41 @@
+from datetime import timedelta
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
+from django.utils import timezone
 import json
+import re
+
+def serialize_schema(schema):
+    """Serialize a schema to compact UTF-8 JSON bytes, matching the API renderer output"""
+    return json.dumps(schema, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def overall_scores(evaluation_results):
+    """
+    Extract the warehouse and AI enhanced overall scores from evaluation results.
+    
+    Returns:
+        tuple: (warehouse_score, ai_enhanced_score), both None when there are no results
+    """
+    if not evaluation_results:
+        return None, None
+    return (
+        evaluation_results.get('warehouse_schema_evaluation', {}).get('overall_score', 0),
+        evaluation_results.get('ai_enhanced_schema_evaluation', {}).get('overall_score', 0),
+    )
+
+# Matches the key constraints in any case, so constraint strings are never lowercased
+_CONSTRAINT_RE = re.compile(r'primary key|foreign key', re.IGNORECASE)
+
+def _classify_key_column(column, joined_constraints, pk_columns, fk_columns):
+    """Add a column's name to pk_columns and/or fk_columns from its joined constraints"""
+    # One case-insensitive scan per column; callers join constraints with NUL
+    # so a match can't span two of them
+    for match in _CONSTRAINT_RE.findall(joined_constraints):
+        if match[0] in 'pP':
+            pk_columns.add(column.get('name'))
+        else:
+            fk_columns.add(column.get('name'))
 
 class User(AbstractUser):
     """Extended User model for authentication"""
@@ -15,8 +50,29 @@ class User(AbstractUser):
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.serialized_cache_key(self.pk))
+    
+    @staticmethod
+    def serialized_cache_key(user_id):
+        """Cache key of a user's serialized profile, cleared whenever the user is saved"""
+        return f'user:serialized:{user_id}'
 
 class UserDatabase(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    # Generation runs in an in-process thread pool, so a worker restart loses its jobs;
+    # a schema still pending after this long is treated as failed
+    PENDING_TIMEOUT = timedelta(minutes=15)
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='databases')
     original_schema = models.JSONField()
     warehouse_schema = models.JSONField()
@@ -24,15 +80,167 @@ class UserDatabase(models.Model):
     domain = models.CharField(max_length=100)
     schema_name = models.CharField(max_length=255, default="Untitled Schema")
     evaluation_results = models.JSONField(null=True, blank=True)
+    # Overall scores copied out of evaluation_results on save, so they can be aggregated in SQL
+    warehouse_score = models.FloatField(null=True, blank=True, db_index=True, editable=False)
+    ai_enhanced_score = models.FloatField(null=True, blank=True, db_index=True, editable=False)
+    # Progress of the background AI pipeline started by generate_schema
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_COMPLETED)
+    # JSON bytes of each schema, serialized once on save for the schema GET endpoints
+    original_schema_json = models.BinaryField(null=True, blank=True, editable=False)
+    warehouse_schema_json = models.BinaryField(null=True, blank=True, editable=False)
+    ai_enhanced_schema_json = models.BinaryField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    SERIALIZED_SCHEMA_FIELDS = {
+        'original_schema': 'original_schema_json',
+        'warehouse_schema': 'warehouse_schema_json',
+        'ai_enhanced_schema': 'ai_enhanced_schema_json',
+    }
+
+    # Large per-schema columns that list and summary queries should defer
+    SCHEMA_BLOB_FIELDS = (
+        *SERIALIZED_SCHEMA_FIELDS,
+        *SERIALIZED_SCHEMA_FIELDS.values(),
+    )
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's schemas, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='userdb_user_created_id_idx'),
+            # The same list filtered to one domain
+            models.Index(fields=['user', 'domain', '-created_at', '-id'], name='userdb_user_domain_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.schema_name} ({self.domain})"
     
+    def save(self, *args, **kwargs):
+        """Refresh the serialized schema copies and score columns derived from the fields being saved"""
+        update_fields = kwargs.get('update_fields')
+        derived_fields = []
+        for schema_field, json_field in self.SERIALIZED_SCHEMA_FIELDS.items():
+            if update_fields is not None and schema_field not in update_fields:
+                continue
+            schema = getattr(self, schema_field)
+            # Empty schemas are left unserialized so the views report them as missing
+            setattr(self, json_field, serialize_schema(schema) if schema else None)
+            derived_fields.append(json_field)
+        
+        if update_fields is None or 'evaluation_results' in update_fields:
+            self.warehouse_score, self.ai_enhanced_score = overall_scores(self.evaluation_results)
+            derived_fields += ['warehouse_score', 'ai_enhanced_score']
+        
+        if update_fields is not None:
+            # updated_at versions the row (schema ETags), so it is always written
+            kwargs['update_fields'] = set(update_fields).union(derived_fields, ['updated_at'])
+        super().save(*args, **kwargs)
+        self.clear_user_caches(self.user_id)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.clear_user_caches(self.user_id)
+        return result
+    
+    def fail_if_stale(self):
+        """
+        Mark a pending schema as failed if its generation hasn't finished within PENDING_TIMEOUT.
+        
+        Returns:
+            bool: True if the schema was marked as failed
+        """
+        if self.status != self.STATUS_PENDING:
+            return False
+        now = timezone.now()
+        # Conditional update, so a generation that finishes meanwhile is not overwritten
+        marked = UserDatabase.objects.filter(
+            pk=self.pk, status=self.STATUS_PENDING, updated_at__lt=now - self.PENDING_TIMEOUT
+        ).update(status=self.STATUS_FAILED, updated_at=now)
+        if marked:
+            self.status = self.STATUS_FAILED
+            self.updated_at = now
+            self.clear_user_caches(self.user_id)
+        return bool(marked)
+    
+    @staticmethod
+    def dashboard_cache_key(user_id):
+        """Cache key of a user's dashboard statistics, cleared whenever one of their schemas changes"""
+        return f'dashboard:stats:{user_id}'
+    
+    @staticmethod
+    def schema_count_cache_key(user_id):
+        """Cache key of a user's schema list counts by domain filter, cleared whenever one of their schemas changes"""
+        return f'schemas:count:{user_id}'
+    
+    @classmethod
+    def clear_user_caches(cls, user_id):
+        """Clear the cached figures derived from a user's schemas"""
+        cache.delete_many([cls.dashboard_cache_key(user_id), cls.schema_count_cache_key(user_id)])
+    
+    @staticmethod
+    def annotate_pk_fk(schema, skip_annotated=False, validated=False):
+        """
+        Add 'pk_columns' and 'fk_columns' to each table based on its column constraints.
+        
+        Called on the write path before a schema is saved, so reads use the stored lists.
+        
+        Args:
+            schema (dict): Schema mapping table names to definitions with a 'columns' list
+            skip_annotated (bool): Leave tables that already have both lists untouched
+            validated (bool): The schema passed validate_schema_structure, so every column
+                is a dict with a list of string constraints and needs no type checks
+            
+        Returns:
+            dict: The same schema, annotated in place
+        """
+        if validated:
+            for table_info in schema.values():
+                pk_columns = set()
+                fk_columns = set()
+                for column in table_info['columns']:
+                    _classify_key_column(column, '\0'.join(column['constraints']), pk_columns, fk_columns)
+                table_info['pk_columns'] = list(pk_columns)
+                table_info['fk_columns'] = list(fk_columns)
+            return schema
+        
+        if not isinstance(schema, dict):
+            return schema
+        
+        for table_info in schema.values():
+            if not isinstance(table_info, dict):
+                continue
+            if skip_annotated and 'pk_columns' in table_info and 'fk_columns' in table_info:
+                continue
+            
+            pk_columns = set()
+            fk_columns = set()
+            
+            columns = table_info.get('columns', [])
+            if isinstance(columns, list):
+                for column in columns:
+                    if not isinstance(column, dict):
+                        continue
+                    
+                    constraints = column.get('constraints', [])
+                    
+                    if isinstance(constraints, list):
+                        if all(isinstance(c, str) for c in constraints):
+                            joined = '\0'.join(constraints)
+                        else:
+                            joined = '\0'.join(str(c) for c in constraints)
+                    elif isinstance(constraints, str):
+                        joined = constraints
+                    else:
+                        continue
+                    
+                    _classify_key_column(column, joined, pk_columns, fk_columns)
+            
+            table_info['pk_columns'] = list(pk_columns)
+            table_info['fk_columns'] = list(fk_columns)
+        
+        return schema
+    
     def get_evaluation_summary(self):
         """Get a summary of evaluation results"""
         if not self.evaluation_results:
@@ -3,6 +3,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.db.models.fields.json import KT
 from .models import User, UserDatabase
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -57,8 +58,8 @@ class UserDatabaseSerializer(serializers.ModelSerializer):
         model = UserDatabase
         fields = ('id', 'user', 'schema_name', 'domain', 'original_schema', 
                  'warehouse_schema', 'ai_enhanced_schema', 'evaluation_results', 
-                 'evaluation_summary', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'user', 'created_at', 'updated_at')
+                 'evaluation_summary', 'status', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'user', 'status', 'created_at', 'updated_at')
     
     def get_evaluation_summary(self, obj):
         return obj.get_evaluation_summary()
@@ -66,13 +67,35 @@ class UserDatabaseSerializer(serializers.ModelSerializer):
 class UserDatabaseListSerializer(serializers.ModelSerializer):
     evaluation_summary = serializers.SerializerMethodField()
     
+    # Model columns read when serializing, for .only() on list querysets; the
+    # summary uses the score columns instead of the evaluation_results document
+    MODEL_COLUMNS = ('id', 'schema_name', 'domain', 'warehouse_score', 'ai_enhanced_score', 'status', 'created_at', 'updated_at')
+    
     class Meta:
         model = UserDatabase
-        fields = ('id', 'schema_name', 'domain', 'evaluation_summary', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        fields = ('id', 'schema_name', 'domain', 'evaluation_summary', 'status', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'status', 'created_at', 'updated_at')
+    
+    @classmethod
+    def setup_queryset(cls, queryset):
+        """Load only what this serializer reads, extracting the best schema type from evaluation_results in SQL"""
+        return queryset.only(*cls.MODEL_COLUMNS).annotate(
+            best_schema=KT('evaluation_results__best_schema_recommendation__schema_type')
+        )
     
     def get_evaluation_summary(self, obj):
-        return obj.get_evaluation_summary()
+        # Instances not loaded through setup_queryset read evaluation_results instead
+        if not hasattr(obj, 'best_schema'):
+            return obj.get_evaluation_summary()
+        if obj.warehouse_score is None:
+            return None
+        return {
+            'warehouse_score': obj.warehouse_score,
+            'ai_enhanced_score': obj.ai_enhanced_score,
+            'best_schema': obj.best_schema or 'unknown',
+            'domain': obj.domain,
+            'created_at': obj.created_at.isoformat()
+        }
 
 class SchemaUpdateSerializer(serializers.Serializer):
     schema = serializers.JSONField()
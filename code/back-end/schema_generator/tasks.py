@@ -0,0 +1,95 @@
+# schema_generator/tasks.py
+
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from .models import UserDatabase
+from .ai_services import generate_ai_suggestions
+from .utils.evaluation import evaluate_schemas
+
+# Background workers for the AI pipeline. The work is dominated by network-bound
+# LLM calls, so threads keep request workers free without a separate task queue.
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='schema-generation')
+
+def generate_ai(user_db_id):
+    """
+    Run the AI pipeline for a pending schema and store the results.
+
+    Args:
+        user_db_id (int): Primary key of the UserDatabase holding the parsed original schema
+    """
+    user_database = UserDatabase.objects.get(id=user_db_id)
+    original_schema = user_database.original_schema
+
+    # Generate AI suggestions and enhancements
+    try:
+        ai_result = generate_ai_suggestions(original_schema)
+        warehouse_schema = ai_result['warehouse_schema']
+        ai_enhanced_schema = ai_result['ai_enhanced_schema']
+        domain = ai_result.get('domain', 'Unknown')
+        missing_tables = ai_result.get('missing_tables', [])
+        missing_columns = ai_result.get('missing_columns', [])
+        ai_suggestions = ai_result.get('suggestions', {})
+    except Exception as e:
+        print(f"Error generating AI suggestions: {e}")
+        user_database.status = UserDatabase.STATUS_FAILED
+        user_database.save(update_fields=['status'])
+        return
+
+    # Evaluate schemas
+    try:
+        evaluation_results = evaluate_schemas(original_schema, warehouse_schema, ai_enhanced_schema)
+        # Add AI suggestions to evaluation results
+        evaluation_results['ai_suggestions'] = {
+            'missing_tables': missing_tables,
+            'missing_columns': missing_columns,
+            'domain_suggestions': ai_suggestions
+        }
+    except Exception as e:
+        print(f"Evaluation error: {e}")
+        evaluation_results = {
+            'ai_suggestions': {
+                'missing_tables': missing_tables,
+                'missing_columns': missing_columns,
+                'domain_suggestions': ai_suggestions
+            }
+        }
+
+    # Record key columns now so reads never have to derive them
+    user_database.warehouse_schema = UserDatabase.annotate_pk_fk(warehouse_schema, skip_annotated=True)
+    user_database.ai_enhanced_schema = UserDatabase.annotate_pk_fk(ai_enhanced_schema, skip_annotated=True)
+    user_database.domain = domain
+    user_database.evaluation_results = evaluation_results
+    user_database.status = UserDatabase.STATUS_COMPLETED
+    user_database.save(update_fields=[
+        'warehouse_schema',
+        'ai_enhanced_schema',
+        'domain',
+        'evaluation_results',
+        'status',
+    ])
+
+def _generate_ai_in_background(user_db_id):
+    try:
+        generate_ai(user_db_id)
+    except Exception as e:
+        print(f"Schema generation failed for {user_db_id}: {e}")
+        # Saved through the model, so the user's cached dashboard and list figures are cleared
+        user_database = UserDatabase.objects.filter(id=user_db_id).only('id', 'user_id', 'status').first()
+        if user_database is not None:
+            user_database.status = UserDatabase.STATUS_FAILED
+            user_database.save(update_fields=['status'])
+    finally:
+        # Worker threads get their own connection; don't leave it open between jobs
+        connection.close()
+
+def enqueue_schema_generation(user_db_id):
+    """
+    Schedule generate_ai for a schema once the current transaction commits.
+
+    Runs inline instead when settings.SCHEMA_GENERATION_ASYNC is False.
+    """
+    if getattr(settings, 'SCHEMA_GENERATION_ASYNC', True):
+        transaction.on_commit(lambda: executor.submit(_generate_ai_in_background, user_db_id))
+    else:
+        transaction.on_commit(lambda: generate_ai(user_db_id))
@@ -225,6 +225,44 @@ class UserDatabaseModelTest(TestCase):
         self.assertEqual(db.ai_enhanced_schema, valid_json_data)
         self.assertEqual(db.evaluation_results, valid_json_data)
     
+    def test_schema_json_serialized_on_save(self):
+        """Test that schema fields are serialized to JSON bytes when saved"""
+        db = UserDatabase.objects.create(**self.database_data)
+        self.assertEqual(json.loads(bytes(db.warehouse_schema_json)), self.sample_schema)
+        
+        updated_schema = {'dim_date': {'columns': []}}
+        db.warehouse_schema = updated_schema
+        db.save(update_fields=['warehouse_schema'])
+        
+        db.refresh_from_db()
+        self.assertEqual(json.loads(bytes(db.warehouse_schema_json)), updated_schema)
+        self.assertEqual(json.loads(bytes(db.original_schema_json)), self.sample_schema)
+    
+    def test_empty_schema_not_serialized(self):
+        """Test that empty schemas are not given a serialized copy"""
+        data = self.database_data.copy()
+        data['ai_enhanced_schema'] = {}
+        
+        db = UserDatabase.objects.create(**data)
+        self.assertIsNone(db.ai_enhanced_schema_json)
+    
+    def test_annotate_pk_fk(self):
+        """Test recording primary and foreign key columns on each table"""
+        schema = {
+            'fact_sales': {
+                'columns': [
+                    {'name': 'sale_key', 'type': 'INTEGER', 'constraints': ['primary key']},
+                    {'name': 'product_key', 'type': 'INTEGER', 'constraints': ['Foreign Key', 'NOT NULL']}
+                ]
+            },
+            'dim_product': {'columns': [], 'pk_columns': ['product_key'], 'fk_columns': []}
+        }
+
+        UserDatabase.annotate_pk_fk(schema, skip_annotated=True)
+        self.assertEqual(schema['fact_sales']['pk_columns'], ['sale_key'])
+        self.assertEqual(schema['fact_sales']['fk_columns'], ['product_key'])
+        self.assertEqual(schema['dim_product']['pk_columns'], ['product_key'])
+
     def test_evaluation_results_nullable(self):
         """Test that evaluation_results can be null"""
         data = self.database_data.copy()
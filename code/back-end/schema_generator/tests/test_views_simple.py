@@ -1,10 +1,20 @@
 import json
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from schema_generator.ai_services import analyze_schema, generate_ai_suggestions, schema_cache_key
 from schema_generator.models import UserDatabase
+from schema_generator.tasks import _generate_ai_in_background
+from schema_generator.views import schema_to_json, schema_to_sql, schema_to_sql_iter, stream_schema_to_sql
 
 User = get_user_model()
 
@@ -101,6 +111,104 @@ class UserDatabaseAPITest(APITestCase):
         self.assertIn('results', response.data)
         self.assertEqual(len(response.data['results']), 1)
     
+    def test_get_user_schemas_cursor_pagination(self):
+        """Test walking the schema list with keyset pagination cursors"""
+        for i in range(2):
+            UserDatabase.objects.create(
+                user=self.user,
+                original_schema=self.sample_schema,
+                warehouse_schema=self.sample_schema,
+                ai_enhanced_schema=self.sample_schema,
+                domain='E-commerce',
+                schema_name=f'Schema {i}'
+            )
+        
+        response = self.client.get('/api/schema/dashboard/schemas/', {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_count'], 3)
+        first_page = [schema['id'] for schema in response.data['results']]
+        self.assertEqual(len(first_page), 2)
+        self.assertIsNotNone(response.data['next_cursor'])
+        
+        response = self.client.get('/api/schema/dashboard/schemas/', {
+            'page_size': 2,
+            'cursor': response.data['next_cursor']
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second_page = [schema['id'] for schema in response.data['results']]
+        self.assertEqual(second_page, [self.user_database.id])
+        self.assertIsNone(response.data['next_cursor'])
+        self.assertNotIn(self.user_database.id, first_page)
+    
+    def test_get_user_schemas_skips_schema_columns(self):
+        """Test that the schema list does not load the schema JSON columns"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/schema/dashboard/schemas/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        list_queries = [q['sql'] for q in queries if 'schema_generator_userdatabase' in q['sql']]
+        self.assertEqual(len(list_queries), 2)  # COUNT + page
+        for sql in list_queries:
+            self.assertNotIn('warehouse_schema', sql)
+    
+    def test_get_user_schemas_evaluation_summary(self):
+        """Test that the list summary is built from the score columns and best schema path"""
+        self.user_database.evaluation_results = {
+            'warehouse_schema_evaluation': {'overall_score': 80},
+            'ai_enhanced_schema_evaluation': {'overall_score': 90},
+            'best_schema_recommendation': {'schema_type': 'ai_enhanced'}
+        }
+        self.user_database.save()
+
+        response = self.client.get('/api/schema/dashboard/schemas/')
+
+        summary = response.data['results'][0]['evaluation_summary']
+        self.assertEqual(summary['warehouse_score'], 80)
+        self.assertEqual(summary['ai_enhanced_score'], 90)
+        self.assertEqual(summary['best_schema'], 'ai_enhanced')
+
+    def test_get_user_schemas_count_cached(self):
+        """Test that the list count is cached until the user's schemas change"""
+        self.client.get('/api/schema/dashboard/schemas/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/schema/dashboard/schemas/')
+
+        self.assertEqual(response.data['total_count'], 1)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries))
+
+        UserDatabase.objects.create(
+            user=self.user,
+            original_schema=self.sample_schema,
+            warehouse_schema=self.sample_schema,
+            ai_enhanced_schema=self.sample_schema,
+            domain='E-commerce',
+            schema_name='Another Schema'
+        )
+        response = self.client.get('/api/schema/dashboard/schemas/')
+        self.assertEqual(response.data['total_count'], 2)
+
+    def test_get_user_schemas_domain_filter(self):
+        """Test filtering the schema list by domain"""
+        UserDatabase.objects.create(
+            user=self.user,
+            original_schema=self.sample_schema,
+            warehouse_schema=self.sample_schema,
+            ai_enhanced_schema=self.sample_schema,
+            domain='Healthcare',
+            schema_name='Clinic'
+        )
+
+        response = self.client.get('/api/schema/dashboard/schemas/', {'domain': 'Healthcare'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([schema['schema_name'] for schema in response.data['results']], ['Clinic'])
+
+    def test_get_user_schemas_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get('/api/schema/dashboard/schemas/', {'cursor': 'not-a-cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
     def test_get_user_schemas_unauthenticated(self):
         """Test getting user schemas without authentication"""
         self.client.credentials()
@@ -110,11 +218,201 @@ class UserDatabaseAPITest(APITestCase):
     
     def test_delete_schema_authenticated(self):
         """Test deleting schema with authentication"""
-        response = self.client.delete(f'/api/schema/dashboard/schemas/{self.user_database.id}/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(f'/api/schema/dashboard/schemas/{self.user_database.id}/')
         
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        schema_queries = [q['sql'] for q in queries if 'schema_generator_userdatabase' in q['sql']]
+        self.assertEqual(len(schema_queries), 1)
+        self.assertTrue(schema_queries[0].startswith('DELETE'))
         self.assertFalse(UserDatabase.objects.filter(id=self.user_database.id).exists())
 
+    def test_schema_detail_of_other_user_not_found(self):
+        """Test that another user's schema is reported as not found"""
+        other_user = User.objects.create_user(
+            email='other@example.com',
+            username='otheruser',
+            first_name='Other',
+            last_name='User',
+            password='testpass123'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other_user).access_token}')
+
+        response = self.client.get(f'/api/schema/dashboard/schemas/{self.user_database.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.delete(f'/api/schema/dashboard/schemas/{self.user_database.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(UserDatabase.objects.filter(id=self.user_database.id).exists())
+
+    def test_export_schema_render_error_returns_json_error(self):
+        """Test that an export failing before any output is sent gets an error response"""
+        def failing_render(*args):
+            raise ValueError('bad schema')
+            yield
+        
+        with patch('schema_generator.views.orjson', None), \
+                patch('schema_generator.views.batch_chunks', side_effect=failing_render):
+            response = self.client.get(f'/api/schema/export/{self.user_database.id}/warehouse/json/')
+        
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('bad schema', response.data['error'])
+    
+    def test_export_schema_error_mid_stream_ends_body(self):
+        """Test that an export failing part way through ends the stream instead of raising"""
+        def failing_render(*args):
+            yield '{\n'
+            raise ValueError('bad table')
+        
+        with patch('schema_generator.views.orjson', None), \
+                patch('schema_generator.views.batch_chunks', side_effect=failing_render):
+            response = self.client.get(f'/api/schema/export/{self.user_database.id}/warehouse/json/')
+            body = b''.join(response.streaming_content)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, b'{\n')
+    
+    def test_stale_pending_schema_reported_failed(self):
+        """Test that a schema left pending past the timeout is marked failed when read"""
+        UserDatabase.objects.filter(id=self.user_database.id).update(
+            status=UserDatabase.STATUS_PENDING,
+            updated_at=timezone.now() - UserDatabase.PENDING_TIMEOUT - timedelta(minutes=1)
+        )
+        
+        response = self.client.get(f'/api/schema/dashboard/schemas/{self.user_database.id}/')
+        
+        self.assertEqual(response.data['status'], UserDatabase.STATUS_FAILED)
+        self.user_database.refresh_from_db()
+        self.assertEqual(self.user_database.status, UserDatabase.STATUS_FAILED)
+    
+    def test_recent_pending_schema_stays_pending(self):
+        """Test that a schema whose generation may still be running stays pending"""
+        UserDatabase.objects.filter(id=self.user_database.id).update(status=UserDatabase.STATUS_PENDING)
+        
+        response = self.client.get(f'/api/schema/dashboard/schemas/{self.user_database.id}/')
+        
+        self.assertEqual(response.data['status'], UserDatabase.STATUS_PENDING)
+    
+    def test_get_warehouse_schema(self):
+        """Test getting the warehouse schema returns the stored JSON"""
+        response = self.client.get(f'/api/schema/warehouse_schema/{self.user_database.id}/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), self.sample_schema)
+    
+    def test_get_schema_without_serialized_copy(self):
+        """Test that rows without a serialized copy fall back to the JSON column"""
+        UserDatabase.objects.filter(id=self.user_database.id).update(original_schema_json=None)
+        
+        response = self.client.get(f'/api/schema/original_schema/{self.user_database.id}/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.sample_schema)
+    
+    def test_get_schema_not_modified(self):
+        """Test that a matching If-None-Match returns 304 until the schema changes"""
+        url = f'/api/schema/warehouse_schema/{self.user_database.id}/'
+        etag = self.client.get(url)['ETag']
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.user_database.warehouse_schema = {'dim_date': {'columns': []}}
+        self.user_database.save(update_fields=['warehouse_schema'])
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_schema_to_sql(self):
+        """Test converting a schema to SQL CREATE TABLE statements"""
+        self.assertEqual(
+            schema_to_sql(self.sample_schema, 'warehouse_schema'),
+            "-- WAREHOUSE_SCHEMA SCHEMA\n-- Generated by Warehouse Schema Generator\n\n"
+            "CREATE TABLE customers (\n"
+            "    id INTEGER PRIMARY KEY,\n"
+            "    name VARCHAR(100) NOT NULL\n"
+            ");\n\n"
+        )
+
+    def test_schema_to_json(self):
+        """Test rendering a schema as indented JSON for download"""
+        content = schema_to_json(self.sample_schema)
+        
+        self.assertEqual(json.loads(content), self.sample_schema)
+        self.assertIn('\n  "customers"', content.decode('utf-8') if isinstance(content, bytes) else content)
+    
+    def test_stream_schema_to_sql_cached(self):
+        """Test that the SQL for an unchanged schema is only rendered once"""
+        cache.clear()
+        with patch('schema_generator.views.schema_to_sql_iter', wraps=schema_to_sql_iter) as mock_render:
+            first = ''.join(stream_schema_to_sql(self.sample_schema, 'warehouse_schema'))
+            second = ''.join(stream_schema_to_sql(json.loads(json.dumps(self.sample_schema)), 'warehouse_schema'))
+        
+        self.assertEqual(first, schema_to_sql(self.sample_schema, 'warehouse_schema'))
+        self.assertEqual(second, first)
+        self.assertEqual(mock_render.call_count, 1)
+    
+    def test_stream_schema_to_sql_respects_table_order(self):
+        """Test that schemas differing only in table order don't share cached SQL"""
+        cache.clear()
+        tables = {
+            'customers': self.sample_schema['customers'],
+            'orders': {'columns': [{'name': 'order_id', 'type': 'INTEGER', 'constraints': ['PRIMARY KEY']}]}
+        }
+        reordered = dict(reversed(list(tables.items())))
+        
+        first = ''.join(stream_schema_to_sql(tables, 'warehouse_schema'))
+        second = ''.join(stream_schema_to_sql(reordered, 'warehouse_schema'))
+        
+        self.assertEqual(second, schema_to_sql(reordered, 'warehouse_schema'))
+        self.assertNotEqual(second, first)
+
+    def test_update_schema_annotates_keys(self):
+        """Test that updating a schema records primary and foreign key columns"""
+        updated_schema = {
+            'fact_orders': {
+                'columns': [
+                    {'name': 'order_key', 'type': 'INTEGER', 'constraints': ['PRIMARY KEY']},
+                    {'name': 'customer_key', 'type': 'INTEGER', 'constraints': ['NOT NULL', 'Foreign Key REFERENCES dim_customer']},
+                    {'name': 'amount', 'type': 'DECIMAL(10,2)', 'constraints': 'not null'}
+                ]
+            }
+        }
+
+        response = self.client.put('/api/schema/update-schema/', {
+            'schema_id': self.user_database.id,
+            'schema_type': 'warehouse',
+            'schema': updated_schema
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        table = response.data['schema']['fact_orders']
+        self.assertEqual(table['pk_columns'], ['order_key'])
+        self.assertEqual(table['fk_columns'], ['customer_key'])
+        self.assertEqual(table['columns'][2]['constraints'], ['not null'])
+
+        self.user_database.refresh_from_db()
+        self.assertEqual(self.user_database.warehouse_schema['fact_orders']['pk_columns'], ['order_key'])
+
+    def test_get_metadata_table_counts(self):
+        """Test that metadata reports the number of tables in each schema"""
+        self.user_database.ai_enhanced_schema = {
+            'fact_sales': {'columns': []},
+            'dim_customer': {'columns': []}
+        }
+        self.user_database.evaluation_results = {'recommendations': ['Add a date dimension']}
+        self.user_database.save()
+
+        response = self.client.get(f'/api/schema/metadata/{self.user_database.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ai_suggestions = response.data['ai_suggestions']
+        self.assertEqual(ai_suggestions['warehouse_tables_count'], 1)
+        self.assertEqual(ai_suggestions['ai_enhanced_tables_count'], 2)
+        self.assertEqual(ai_suggestions['recommendations'], ['Add a date dimension'])
+
 
 class DashboardAPITest(APITestCase):
     """Test cases for Dashboard API endpoints"""
@@ -152,10 +450,268 @@ class DashboardAPITest(APITestCase):
         self.assertIn('statistics', response.data)
         self.assertIn('domain_distribution', response.data)
         self.assertIn('recent_schemas', response.data)
+
+    def test_dashboard_average_scores(self):
+        """Test that average scores only include evaluated schemas"""
+        UserDatabase.objects.create(
+            user=self.user,
+            original_schema={'test': 'schema'},
+            warehouse_schema={'test': 'schema'},
+            ai_enhanced_schema={'test': 'schema'},
+            domain='Healthcare',
+            schema_name='Schema 2',
+            evaluation_results={
+                'warehouse_schema_evaluation': {'overall_score': 80},
+                'ai_enhanced_schema_evaluation': {'overall_score': 90}
+            }
+        )
+        UserDatabase.objects.create(
+            user=self.user,
+            original_schema={'test': 'schema'},
+            warehouse_schema={'test': 'schema'},
+            ai_enhanced_schema={'test': 'schema'},
+            domain='Healthcare',
+            schema_name='Schema 3',
+            evaluation_results={
+                'warehouse_schema_evaluation': {'overall_score': 70}
+            }
+        )
+
+        response = self.client.get('/api/schema/dashboard/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statistics = response.data['statistics']
+        self.assertEqual(statistics['total_schemas'], 3)
+        self.assertEqual(statistics['avg_warehouse_score'], 75.0)
+        self.assertEqual(statistics['avg_ai_enhanced_score'], 45.0)
+        self.assertEqual(response.data['domain_distribution'], {'E-commerce': 1, 'Healthcare': 2})
+
+    def test_dashboard_statistics_refresh_after_delete(self):
+        """Test that cached dashboard statistics are cleared when a schema is deleted"""
+        response = self.client.get('/api/schema/dashboard/')
+        self.assertEqual(response.data['statistics']['total_schemas'], 1)
+
+        UserDatabase.objects.get(user=self.user).delete()
+
+        response = self.client.get('/api/schema/dashboard/')
+        self.assertEqual(response.data['statistics']['total_schemas'], 0)
+        self.assertEqual(response.data['domain_distribution'], {})
+
+    def test_dashboard_user_refreshes_after_save(self):
+        """Test that the cached user payload is cleared when the user is saved"""
+        response = self.client.get('/api/schema/dashboard/')
+        self.assertEqual(response.data['user']['first_name'], 'Test')
+
+        self.user.first_name = 'Renamed'
+        self.user.save()
+
+        response = self.client.get('/api/schema/dashboard/')
+        self.assertEqual(response.data['user']['first_name'], 'Renamed')
+
+    def test_dashboard_query_count(self):
+        """Test that an uncached dashboard needs one statistics query and one recent schemas query"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/schema/dashboard/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        schema_queries = [q for q in queries if 'schema_generator_userdatabase' in q['sql']]
+        self.assertEqual(len(schema_queries), 2)
+
+    def test_dashboard_skips_schema_columns(self):
+        """Test that the dashboard does not load the schema JSON columns"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/schema/dashboard/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in queries:
+            self.assertNotIn('warehouse_schema', query['sql'])
     
     def test_get_dashboard_data_unauthenticated(self):
         """Test getting dashboard data without authentication"""
         self.client.credentials()
         response = self.client.get('/api/schema/dashboard/')
         
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED) 
+
+
+class GenerateSchemaAPITest(APITestCase):
+    """Test cases for the schema generation API endpoint"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        
+        refresh = RefreshToken.for_user(self.user)
+        self.access_token = str(refresh.access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        
+        self.sql = (
+            "-- Café orders\n"
+            "CREATE TABLE customers (\n"
+            "    customer_id SERIAL PRIMARY KEY,\n"
+            "    name VARCHAR(100) NOT NULL\n"
+            ");\n"
+        )
+        self.warehouse_schema = {
+            'dim_customer': {
+                'columns': [
+                    {'name': 'customer_key', 'type': 'INTEGER', 'constraints': ['PRIMARY KEY']}
+                ]
+            }
+        }
+        self.ai_result = {
+            'domain': 'Retail',
+            'warehouse_schema': self.warehouse_schema,
+            'ai_enhanced_schema': self.warehouse_schema,
+            'missing_tables': [],
+            'missing_columns': [],
+            'suggestions': {}
+        }
+    
+    @patch('schema_generator.tasks.evaluate_schemas', return_value={})
+    @patch('schema_generator.tasks.generate_ai_suggestions')
+    def test_generate_schema_success(self, mock_ai, mock_evaluate):
+        """Test generating schemas from an uploaded SQL file"""
+        mock_ai.return_value = self.ai_result
+        schema_file = SimpleUploadedFile('orders.sql', self.sql.encode('utf-8'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/schema/auth/generate-schema/', {
+                'schema_file': schema_file,
+                'schema_name': 'Orders'
+            }, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['data']['status'], UserDatabase.STATUS_PENDING)
+        original_schema = mock_ai.call_args[0][0]
+        self.assertEqual(
+            [column['name'] for column in original_schema['customers']['columns']],
+            ['customer_id', 'name']
+        )
+        
+        user_database = UserDatabase.objects.get(id=response.data['data']['id'])
+        self.assertEqual(user_database.schema_name, 'Orders')
+        self.assertEqual(user_database.status, UserDatabase.STATUS_COMPLETED)
+        self.assertEqual(user_database.domain, 'Retail')
+        self.assertEqual(user_database.warehouse_schema, self.warehouse_schema)
+    
+    @patch('schema_generator.tasks.generate_ai_suggestions', side_effect=Exception('LLM unavailable'))
+    def test_generate_schema_ai_failure(self, mock_ai):
+        """Test that a failed AI pipeline marks the schema as failed"""
+        schema_file = SimpleUploadedFile('orders.sql', self.sql.encode('utf-8'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/schema/auth/generate-schema/', {
+                'schema_file': schema_file
+            }, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        user_database = UserDatabase.objects.get(id=response.data['data']['id'])
+        self.assertEqual(user_database.status, UserDatabase.STATUS_FAILED)
+    
+    @patch('schema_generator.tasks.connection')
+    @patch('schema_generator.tasks.generate_ai', side_effect=Exception('worker crashed'))
+    def test_background_failure_clears_user_caches(self, mock_generate, mock_connection):
+        """Test that a crashed background job marks the schema failed and clears the user's cached figures"""
+        user_database = UserDatabase.objects.create(
+            user=self.user,
+            original_schema=self.warehouse_schema,
+            warehouse_schema={},
+            ai_enhanced_schema={},
+            domain='',
+            status=UserDatabase.STATUS_PENDING
+        )
+        dashboard_key = UserDatabase.dashboard_cache_key(self.user.id)
+        cache.set(dashboard_key, {'total_schemas': 1})
+        
+        _generate_ai_in_background(user_database.id)
+        
+        user_database.refresh_from_db()
+        self.assertEqual(user_database.status, UserDatabase.STATUS_FAILED)
+        self.assertIsNone(cache.get(dashboard_key))
+    
+    def test_generate_schema_without_file(self):
+        """Test that a schema file is required"""
+        response = self.client.post('/api/schema/auth/generate-schema/', {}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AISuggestionCacheTest(TestCase):
+    """Test caching of AI results by schema content"""
+    
+    def setUp(self):
+        cache.clear()
+        self.schema = {
+            'customers': {
+                'columns': [{'name': 'customer_id', 'type': 'INT', 'constraints': ['PRIMARY KEY']}]
+            }
+        }
+    
+    @patch('schema_generator.ai_services.generate_full_detailed_ai_warehouse', return_value={})
+    @patch('schema_generator.ai_services.generate_warehouse_schema_with_ai', return_value={})
+    @patch('schema_generator.ai_services.analyze_schema')
+    def test_repeat_schema_served_from_cache(self, mock_analyze, *mocks):
+        """Test that the same schema only runs the AI pipeline once"""
+        mock_analyze.return_value = {'domain': 'Retail', 'missing_tables': [], 'missing_columns': []}
+        first = generate_ai_suggestions(self.schema)
+        second = generate_ai_suggestions(json.loads(json.dumps(self.schema)))
+        
+        self.assertEqual(first, second)
+        self.assertEqual(second['domain'], 'Retail')
+        self.assertEqual(mock_analyze.call_count, 1)
+    
+    @patch('schema_generator.ai_services.analyze_schema', side_effect=Exception('LLM unavailable'))
+    def test_failed_run_not_cached(self, mock_analyze):
+        """Test that fallback results are not cached"""
+        generate_ai_suggestions(self.schema)
+        generate_ai_suggestions(self.schema)
+        
+        self.assertEqual(mock_analyze.call_count, 2)
+    
+    @patch('schema_generator.ai_services.generate_text', return_value='')
+    def test_empty_ai_response_not_cached(self, mock_generate):
+        """Test that a run built from fallback results is not cached when the model returns nothing"""
+        first = generate_ai_suggestions(self.schema)
+        calls = mock_generate.call_count
+        generate_ai_suggestions(self.schema)
+        
+        self.assertTrue(first['warehouse_schema'])
+        self.assertIsNone(cache.get(schema_cache_key('suggestions', self.schema)))
+        self.assertEqual(mock_generate.call_count, 2 * calls)
+    
+    @patch('schema_generator.ai_services.detect_domain_with_ai')
+    @patch('schema_generator.ai_services.generate_text')
+    def test_analyze_schema_single_call(self, mock_generate, mock_detect):
+        """Test that domain and missing elements come from one AI response"""
+        mock_generate.return_value = json.dumps({
+            'domain': 'retail',
+            'missing_tables': [{'name': 'stores', 'purpose': 'Store locations'}],
+            'missing_columns': []
+        })
+        
+        analysis = analyze_schema(self.schema)
+        
+        self.assertEqual(analysis['domain'], 'Retail')
+        self.assertEqual(analysis['missing_tables'][0]['name'], 'stores')
+        self.assertEqual(mock_generate.call_count, 1)
+        mock_detect.assert_not_called()
+    
+    @patch('schema_generator.ai_services.suggest_missing_elements', return_value={'missing_tables': []})
+    @patch('schema_generator.ai_services.detect_domain_with_ai', return_value='Finance')
+    @patch('schema_generator.ai_services.generate_text', return_value='not json')
+    def test_analyze_schema_fallback(self, mock_generate, mock_detect, mock_suggest):
+        """Test falling back to separate AI calls when the combined response is unusable"""
+        analysis = analyze_schema(self.schema)
+        
+        self.assertEqual(analysis['domain'], 'Finance')
+        self.assertEqual(analysis['missing_columns'], [])
+        mock_suggest.assert_called_once_with(self.schema, 'Finance', fallbacks=None)
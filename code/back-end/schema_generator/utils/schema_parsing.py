@@ -4,8 +4,9 @@ import re
 
 def parse_sql_file(file_path):
     with open(file_path, 'r') as file:
-        sql_content = file.read()
+        return parse_sql_string(file.read())
 
+def parse_sql_string(sql_content):
     # Remove comments and unnecessary whitespace
     sql_content = re.sub(r'--.*\n', '', sql_content)
     sql_content = ' '.join(sql_content.split())
@@ -4,25 +4,39 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import UserDatabaseSerializer
-from .models import UserDatabase
-from .utils.schema_parsing import parse_sql_file
+from .models import UserDatabase, serialize_schema
+from .db_functions import JSONKeyCount
 from .utils.evaluation import evaluation_framework
 from .ai_services import (
-    detect_domain_with_ai,
+    analyze_schema,
     suggest_missing_elements,
     generate_warehouse_schema_with_ai,
-    generate_full_detailed_ai_warehouse
+    generate_full_detailed_ai_warehouse,
+    schema_cache_key,
+    AI_CACHE_TIMEOUT
 )
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
+from django.db.models import Count, Q, Sum
+import base64
+import hashlib
+import io
+import itertools
 import json
 import os
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson
+except ImportError:  # Optional; JSON exports fall back to the stdlib encoder
+    orjson = None
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from django.core.cache import cache
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.authtoken.models import Token
@@ -37,14 +51,19 @@ from .serializers import (
     UserDatabaseListSerializer,
     SchemaUpdateSerializer
 )
-from .utils.schema_parsing import parse_sql_file
-from .ai_services import generate_ai_suggestions
-from .utils.evaluation import evaluate_schemas
+from .utils.schema_parsing import parse_sql_string
+from .tasks import enqueue_schema_generation
+
+# Column line of a CREATE TABLE statement: name, type and an optional " constraints" suffix
+COLUMN_SQL_FORMAT = "    {} {}{}".format
 
 def validate_schema_structure(schema, schema_name="schema"):
     """
     Validate that the schema has the correct structure.
     
+    Each column's 'constraints' is normalized in place to a list of strings, so
+    valid schemas can be processed without further type checks.
+    
     Args:
         schema (dict): The schema to validate
         schema_name (str): Name for logging purposes
@@ -65,11 +84,12 @@ def validate_schema_structure(schema, schema_name="schema"):
             print(f"Error: {schema_name} table '{table_name}' missing 'columns' key")
             return False
         
-        if not isinstance(table_info['columns'], list):
-            print(f"Error: {schema_name} table '{table_name}' columns is not a list: {type(table_info['columns'])}")
+        columns = table_info['columns']
+        if not isinstance(columns, list):
+            print(f"Error: {schema_name} table '{table_name}' columns is not a list: {type(columns)}")
             return False
         
-        for i, column in enumerate(table_info['columns']):
+        for i, column in enumerate(columns):
             if not isinstance(column, dict):
                 print(f"Error: {schema_name} table '{table_name}' column {i} is not a dictionary: {type(column)}")
                 return False
@@ -83,9 +103,16 @@ def validate_schema_structure(schema, schema_name="schema"):
                 print(f"Error: {schema_name} table '{table_name}' column {i} missing 'type' key")
                 return False
             
-            # Provide default empty constraints if missing
-            if 'constraints' not in column:
+            # Provide default empty constraints if missing, and normalize the rest to a list of strings
+            constraints = column.get('constraints')
+            if not constraints:
                 column['constraints'] = []
+            elif isinstance(constraints, str):
+                column['constraints'] = [constraints]
+            elif not isinstance(constraints, list):
+                column['constraints'] = [str(constraints)]
+            elif not all(isinstance(c, str) for c in constraints):
+                column['constraints'] = [str(c) for c in constraints]
     
     return True
 
@@ -143,52 +170,57 @@ class UploadSchemaAPIView(APIView):
     def post(self, request, format=None):
         serializer = UserDatabaseSerializer(data=request.data)
         if serializer.is_valid():
-            user_db = serializer.save()
-            schema_details = parse_sql_file(user_db.schema_file.path)
+            # Parse the upload in memory; the row is inserted once, after the AI work
+            schema_file = request.FILES.get('schema_file')
+            if not schema_file:
+                return Response({'error': 'No schema file provided'}, status=status.HTTP_400_BAD_REQUEST)
+            schema_details = parse_sql_string(b''.join(schema_file.chunks()).decode('utf-8'))
 
-            # Determine domain
+            # Reuse the AI output of an earlier upload of the same schema and domain choice
             domain = serializer.validated_data.get('domain')
-            if not domain or domain == 'Auto-detect':
-                domain = detect_domain_with_ai(schema_details)
-                user_db.domain = domain
-                user_db.save(update_fields=['domain'])
-
-            # Generate warehouse schema using AI (one fact table + dimensions)
-            warehouse_schema = generate_warehouse_schema_with_ai(schema_details, domain)
-
-            # Process warehouse_schema to add pk_columns and fk_columns if it's valid
-            if isinstance(warehouse_schema, dict):
-                for table_name, table_info in warehouse_schema.items():
-                    if isinstance(table_info, dict):
-                        columns = table_info.get('columns', [])
-                        pk_columns = set()
-                        fk_columns = set()
-                        
-                        if isinstance(columns, list):
-                            for column in columns:
-                                if isinstance(column, dict):
-                                    constraints = column.get('constraints', [])
-                                    column_name = column.get('name')
-
-                                    # Normalize constraints to a list of strings
-                                    if isinstance(constraints, list):
-                                        constraints_list = [str(c).lower() for c in constraints]
-                                    elif isinstance(constraints, str):
-                                        constraints_list = [constraints.lower()]
-                                    else:
-                                        constraints_list = []
-
-                                    # Check for primary key and foreign key constraints
-                                    if any('primary key' in c for c in constraints_list):
-                                        pk_columns.add(column_name)
-                                    if any('foreign key' in c for c in constraints_list):
-                                        fk_columns.add(column_name)
-                        
-                        table_info['pk_columns'] = list(pk_columns)
-                        table_info['fk_columns'] = list(fk_columns)
-
-            # Generate full detailed AI warehouse schema (comprehensive enterprise schema)
-            ai_enhanced_schema = generate_full_detailed_ai_warehouse(schema_details, domain)
+            auto_detect = not domain or domain == 'Auto-detect'
+            cache_key = schema_cache_key('upload', schema_details, None if auto_detect else domain)
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                domain, warehouse_schema, ai_enhanced_schema, ai_suggestions = cached_result
+            else:
+                # Detecting the domain also yields the missing element suggestions
+                # in the same AI call
+                ai_suggestions = None
+                # Names of the AI calls that fell back to a default result
+                fallbacks = []
+                if auto_detect:
+                    ai_suggestions = analyze_schema(schema_details, fallbacks=fallbacks)
+                    domain = ai_suggestions.pop('domain')
+
+                # The warehouse schema, the full detailed AI warehouse and (for a
+                # chosen domain) the missing element suggestions only depend on the
+                # domain, so run the network-bound AI calls concurrently
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    # Generate warehouse schema using AI (one fact table + dimensions)
+                    warehouse_future = executor.submit(generate_warehouse_schema_with_ai, schema_details, domain, fallbacks)
+                    # Generate full detailed AI warehouse schema (comprehensive enterprise schema)
+                    ai_enhanced_future = executor.submit(generate_full_detailed_ai_warehouse, schema_details, domain, fallbacks)
+                    # AI suggestions, unless domain detection already produced them
+                    suggestions_future = None
+                    if ai_suggestions is None:
+                        suggestions_future = executor.submit(suggest_missing_elements, schema_details, domain, fallbacks)
+
+                    warehouse_schema = warehouse_future.result()
+                    ai_enhanced_schema = ai_enhanced_future.result()
+                    if suggestions_future is not None:
+                        ai_suggestions = suggestions_future.result()
+
+                # Results the AI service couldn't produce are retried on the next upload
+                if not fallbacks:
+                    cache.set(
+                        cache_key,
+                        (domain, warehouse_schema, ai_enhanced_schema, ai_suggestions),
+                        AI_CACHE_TIMEOUT
+                    )
+
+            # Record pk_columns and fk_columns on tables the AI service hasn't annotated
+            UserDatabase.annotate_pk_fk(warehouse_schema, skip_annotated=True)
 
             # Validate the AI enhanced schema structure
             if not validate_schema_structure(ai_enhanced_schema, "ai_enhanced_schema"):
@@ -196,74 +228,30 @@ class UploadSchemaAPIView(APIView):
                 ai_enhanced_schema = {}
 
             # Process ai_enhanced_schema (now one fact table + multiple dimension tables) to add pk_columns and fk_columns if possible
-            # Add validation to ensure ai_enhanced_schema is properly formatted
             if isinstance(ai_enhanced_schema, dict):
-                for table_name, table_info in ai_enhanced_schema.items():
-                    # Validate that table_info is a dictionary
-                    if not isinstance(table_info, dict):
-                        print(f"Warning: table_info for {table_name} is not a dictionary: {type(table_info)}")
-                        continue
-                    
-                    columns = table_info.get('columns', [])
-                    pk_columns = set()
-                    fk_columns = set()
-                    
-                    # Validate columns is a list
-                    if not isinstance(columns, list):
-                        print(f"Warning: columns for {table_name} is not a list: {type(columns)}")
-                        continue
-                    
-                    for column in columns:
-                        # Validate column is a dictionary
-                        if not isinstance(column, dict):
-                            print(f"Warning: column in {table_name} is not a dictionary: {type(column)}")
-                            continue
-                            
-                        constraints = column.get('constraints', [])
-                        column_name = column.get('name')
-
-                        # Normalize constraints to a list of strings
-                        if isinstance(constraints, list):
-                            constraints_list = [str(c).lower() for c in constraints]
-                        elif isinstance(constraints, str):
-                            constraints_list = [constraints.lower()]
-                        else:
-                            constraints_list = []
-
-                        # Check for primary key and foreign key constraints
-                        if any('primary key' in c for c in constraints_list):
-                            pk_columns.add(column_name)
-                        if any('foreign key' in c for c in constraints_list):
-                            fk_columns.add(column_name)
-                    
-                    table_info['pk_columns'] = list(pk_columns)
-                    table_info['fk_columns'] = list(fk_columns)
+                UserDatabase.annotate_pk_fk(ai_enhanced_schema, skip_annotated=True)
             else:
                 print(f"Warning: ai_enhanced_schema is not a dictionary: {type(ai_enhanced_schema)}")
 
-            # AI suggestions
-            ai_suggestions = suggest_missing_elements(schema_details, domain)
-
             # Perform comprehensive evaluation
             print("🔬 Starting comprehensive schema evaluation...")
+            original_schema = convert_schema_format(schema_details)
             evaluation_results = evaluation_framework.evaluate_schemas(
-                original_schema=convert_schema_format(schema_details),
+                original_schema=original_schema,
                 warehouse_schema=warehouse_schema,
                 ai_enhanced_schema=ai_enhanced_schema,
                 domain=domain
             )
 
-            # Update the user_db instance with all processed data
-            user_db.original_schema = convert_schema_format(schema_details)
-            user_db.warehouse_schema = warehouse_schema
-            user_db.ai_enhanced_schema = ai_enhanced_schema
-            user_db.evaluation_results = evaluation_results
-            user_db.save(update_fields=[
-                'original_schema',
-                'warehouse_schema',
-                'ai_enhanced_schema',
-                'evaluation_results',
-            ])
+            # Insert the row with all processed data in a single write
+            user_db = serializer.save(
+                user=request.user,
+                domain=domain,
+                original_schema=original_schema,
+                warehouse_schema=warehouse_schema,
+                ai_enhanced_schema=ai_enhanced_schema,
+                evaluation_results=evaluation_results
+            )
 
             response_data = {
                 'message': 'Schema uploaded and processed successfully.',
@@ -277,23 +265,41 @@ class BaseUserDatabaseAPIView(APIView):
     
     def get_user_db(self, pk):
         return get_object_or_404(UserDatabase, pk=pk, user=self.request.user)
+    
+    def get_schema_response(self, pk, schema_field, error_message):
+        """Return a stored schema, sending its pre-serialized JSON bytes when available"""
+        json_field = UserDatabase.SERIALIZED_SCHEMA_FIELDS[schema_field]
+        user_db = get_object_or_404(
+            UserDatabase.objects.only(json_field, 'updated_at'), pk=pk, user=self.request.user
+        )
+        
+        # Schemas only change on save, so the row timestamp versions them
+        etag = f'W/"{user_db.updated_at.timestamp()}"'
+        if etag in parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        
+        schema_json = getattr(user_db, json_field)
+        if schema_json is not None:
+            response = HttpResponse(schema_json, content_type='application/json')
+        else:
+            # Rows saved before the serialized copy existed fall back to the JSON column
+            schema = getattr(user_db, schema_field)
+            if not schema:
+                return Response({'error': error_message}, status=status.HTTP_404_NOT_FOUND)
+            response = Response(schema, status=status.HTTP_200_OK)
+        
+        response['ETag'] = etag
+        return response
 
 class OriginalSchemaAPIView(BaseUserDatabaseAPIView):
     def get(self, request, pk, format=None):
-        user_db = self.get_user_db(pk)
-        if user_db.original_schema:
-            # Ensure the schema is in the correct format
-            formatted_schema = user_db.original_schema
-            if formatted_schema:
-                return Response(formatted_schema, status=status.HTTP_200_OK)
-        return Response({'error': 'Original schema not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return self.get_schema_response(pk, 'original_schema', 'Original schema not found.')
 
 class WarehouseSchemaAPIView(BaseUserDatabaseAPIView):
     def get(self, request, pk, format=None):
-        user_db = self.get_user_db(pk)
-        if user_db.warehouse_schema:
-            return Response(user_db.warehouse_schema, status=status.HTTP_200_OK)
-        return Response({'error': 'Warehouse schema not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return self.get_schema_response(pk, 'warehouse_schema', 'Warehouse schema not found.')
     
     def put(self, request, pk, format=None):
         user_db = self.get_user_db(pk)
@@ -307,34 +313,7 @@ class WarehouseSchemaAPIView(BaseUserDatabaseAPIView):
             return Response({'error': 'Invalid schema structure.'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Process the updated schema to add pk_columns and fk_columns
-        for table_name, table_info in updated_schema.items():
-            if isinstance(table_info, dict):
-                columns = table_info.get('columns', [])
-                pk_columns = set()
-                fk_columns = set()
-                
-                if isinstance(columns, list):
-                    for column in columns:
-                        if isinstance(column, dict):
-                            constraints = column.get('constraints', [])
-                            column_name = column.get('name')
-
-                            # Normalize constraints to a list of strings
-                            if isinstance(constraints, list):
-                                constraints_list = [str(c).lower() for c in constraints]
-                            elif isinstance(constraints, str):
-                                constraints_list = [constraints.lower()]
-                            else:
-                                constraints_list = []
-
-                            # Check for primary key and foreign key constraints
-                            if any('primary key' in c for c in constraints_list):
-                                pk_columns.add(column_name)
-                            if any('foreign key' in c for c in constraints_list):
-                                fk_columns.add(column_name)
-                
-                table_info['pk_columns'] = list(pk_columns)
-                table_info['fk_columns'] = list(fk_columns)
+        UserDatabase.annotate_pk_fk(updated_schema, validated=True)
         
         # Save the updated schema
         user_db.warehouse_schema = updated_schema
@@ -347,10 +326,7 @@ class WarehouseSchemaAPIView(BaseUserDatabaseAPIView):
 
 class AIEnhancedSchemaAPIView(BaseUserDatabaseAPIView):
     def get(self, request, pk, format=None):
-        user_db = self.get_user_db(pk)
-        if user_db.ai_enhanced_schema:
-            return Response(user_db.ai_enhanced_schema, status=status.HTTP_200_OK)
-        return Response({'error': 'AI enhanced schema not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return self.get_schema_response(pk, 'ai_enhanced_schema', 'AI enhanced schema not found.')
     
     def put(self, request, pk, format=None):
         user_db = self.get_user_db(pk)
@@ -364,34 +340,7 @@ class AIEnhancedSchemaAPIView(BaseUserDatabaseAPIView):
             return Response({'error': 'Invalid schema structure.'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Process the updated schema to add pk_columns and fk_columns
-        for table_name, table_info in updated_schema.items():
-            if isinstance(table_info, dict):
-                columns = table_info.get('columns', [])
-                pk_columns = set()
-                fk_columns = set()
-                
-                if isinstance(columns, list):
-                    for column in columns:
-                        if isinstance(column, dict):
-                            constraints = column.get('constraints', [])
-                            column_name = column.get('name')
-
-                            # Normalize constraints to a list of strings
-                            if isinstance(constraints, list):
-                                constraints_list = [str(c).lower() for c in constraints]
-                            elif isinstance(constraints, str):
-                                constraints_list = [constraints.lower()]
-                            else:
-                                constraints_list = []
-
-                            # Check for primary key and foreign key constraints
-                            if any('primary key' in c for c in constraints_list):
-                                pk_columns.add(column_name)
-                            if any('foreign key' in c for c in constraints_list):
-                                fk_columns.add(column_name)
-                
-                table_info['pk_columns'] = list(pk_columns)
-                table_info['fk_columns'] = list(fk_columns)
+        UserDatabase.annotate_pk_fk(updated_schema, validated=True)
         
         # Save the updated schema
         user_db.ai_enhanced_schema = updated_schema
@@ -404,7 +353,16 @@ class AIEnhancedSchemaAPIView(BaseUserDatabaseAPIView):
 
 class MetadataAPIView(BaseUserDatabaseAPIView):
     def get(self, request, pk, format=None):
-        user_db = self.get_user_db(pk)
+        # Count the tables in SQL so the schema JSON columns are never loaded
+        user_db = get_object_or_404(
+            UserDatabase.objects.filter(user=request.user)
+            .annotate(
+                warehouse_tables_count=JSONKeyCount('warehouse_schema'),
+                ai_enhanced_tables_count=JSONKeyCount('ai_enhanced_schema'),
+            )
+            .only('domain', 'evaluation_results'),
+            pk=pk
+        )
         
         # Extract AI suggestions from evaluation results if available
         ai_suggestions = {}
@@ -424,8 +382,8 @@ class MetadataAPIView(BaseUserDatabaseAPIView):
                     'missing_columns': missing_columns,
                     'recommendations': domain_suggestions.get('recommendations', f"Based on {user_db.domain} industry best practices, we've created a comprehensive data warehouse design."),
                     'domain_detected': user_db.domain,
-                    'warehouse_tables_count': len(user_db.warehouse_schema) if user_db.warehouse_schema else 0,
-                    'ai_enhanced_tables_count': len(user_db.ai_enhanced_schema) if user_db.ai_enhanced_schema else 0,
+                    'warehouse_tables_count': user_db.warehouse_tables_count,
+                    'ai_enhanced_tables_count': user_db.ai_enhanced_tables_count,
                 }
             else:
                 # Fallback to recommendations from evaluation results
@@ -433,8 +391,8 @@ class MetadataAPIView(BaseUserDatabaseAPIView):
                 ai_suggestions = {
                     'recommendations': recommendations,
                     'domain_detected': user_db.domain,
-                    'warehouse_tables_count': len(user_db.warehouse_schema) if user_db.warehouse_schema else 0,
-                    'ai_enhanced_tables_count': len(user_db.ai_enhanced_schema) if user_db.ai_enhanced_schema else 0,
+                    'warehouse_tables_count': user_db.warehouse_tables_count,
+                    'ai_enhanced_tables_count': user_db.ai_enhanced_tables_count,
                 }
         
         metadata = {
@@ -464,38 +422,40 @@ class ExportSchemaAPIView(APIView):
         if not schema:
             return ""
         
-        sql_content = f"-- {schema_name.upper()} SCHEMA\n-- Generated by Warehouse Schema Generator\n\n"
+        sql_buffer = io.StringIO()
+        sql_buffer.write(f"-- {schema_name.upper()} SCHEMA\n-- Generated by Warehouse Schema Generator\n\n")
         
         for table_name, table_info in schema.items():
             if not isinstance(table_info, dict) or 'columns' not in table_info:
                 continue
                 
-            sql_content += f"CREATE TABLE {table_name} (\n"
-            columns_sql = []
+            sql_buffer.write(f"CREATE TABLE {table_name} (\n")
+            separator = ""
             
             for column in table_info.get('columns', []):
                 if not isinstance(column, dict):
                     continue
                     
-                column_name = column.get('name', 'unnamed_column')
-                column_type = column.get('type', 'VARCHAR(255)')
                 constraints = column.get('constraints', [])
-                
-                column_sql = f"    {column_name} {column_type}"
-                
                 if constraints:
                     if isinstance(constraints, list):
-                        constraint_str = " ".join(constraints)
+                        constraint_sql = " " + " ".join(constraints)
                     else:
-                        constraint_str = str(constraints)
-                    column_sql += f" {constraint_str}"
+                        constraint_sql = " " + str(constraints)
+                else:
+                    constraint_sql = ""
                 
-                columns_sql.append(column_sql)
+                sql_buffer.write(separator)
+                sql_buffer.write(COLUMN_SQL_FORMAT(
+                    column.get('name', 'unnamed_column'),
+                    column.get('type', 'VARCHAR(255)'),
+                    constraint_sql
+                ))
+                separator = ",\n"
             
-            sql_content += ",\n".join(columns_sql)
-            sql_content += "\n);\n\n"
+            sql_buffer.write("\n);\n\n")
         
-        return sql_content
+        return sql_buffer.getvalue()
     
     def create_response(self, content, filename, content_type):
         """Create HTTP response for file download"""
@@ -515,7 +475,7 @@ class ExportOriginalSchemaAPIView(ExportSchemaAPIView):
             content = self.schema_to_sql(user_db.original_schema, "Original")
             return self.create_response(content, f"original_schema_{pk}.sql", "text/plain")
         elif export_format == 'json':
-            content = json.dumps(user_db.original_schema, indent=2)
+            content = schema_to_json(user_db.original_schema)
             return self.create_response(content, f"original_schema_{pk}.json", "application/json")
         else:
             return Response({'error': 'Invalid format. Use sql or json.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -532,7 +492,7 @@ class ExportWarehouseSchemaAPIView(ExportSchemaAPIView):
             content = self.schema_to_sql(user_db.warehouse_schema, "Warehouse")
             return self.create_response(content, f"warehouse_schema_{pk}.sql", "text/plain")
         elif export_format == 'json':
-            content = json.dumps(user_db.warehouse_schema, indent=2)
+            content = schema_to_json(user_db.warehouse_schema)
             return self.create_response(content, f"warehouse_schema_{pk}.json", "application/json")
         else:
             return Response({'error': 'Invalid format. Use sql or json.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -549,7 +509,7 @@ class ExportAIEnhancedSchemaAPIView(ExportSchemaAPIView):
             content = self.schema_to_sql(user_db.ai_enhanced_schema, "AI Enhanced")
             return self.create_response(content, f"ai_enhanced_schema_{pk}.sql", "text/plain")
         elif export_format == 'json':
-            content = json.dumps(user_db.ai_enhanced_schema, indent=2)
+            content = schema_to_json(user_db.ai_enhanced_schema)
             return self.create_response(content, f"ai_enhanced_schema_{pk}.json", "application/json")
         else:
             return Response({'error': 'Invalid format. Use sql or json.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -562,13 +522,15 @@ class RegisterView(APIView):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
+            user_data = UserSerializer(user).data
             refresh = RefreshToken.for_user(user)
+            access = str(refresh.access_token)
             return Response({
                 'message': 'User registered successfully',
-                'user': UserSerializer(user).data,
+                'user': user_data,
                 'tokens': {
                     'refresh': str(refresh),
-                    'access': str(refresh.access_token),
+                    'access': access,
                 }
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -580,13 +542,15 @@ class LoginView(APIView):
         serializer = UserLoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
+            user_data = UserSerializer(user).data
             refresh = RefreshToken.for_user(user)
+            access = str(refresh.access_token)
             return Response({
                 'message': 'Login successful',
-                'user': UserSerializer(user).data,
+                'user': user_data,
                 'tokens': {
                     'refresh': str(refresh),
-                    'access': str(refresh.access_token),
+                    'access': access,
                 }
             }, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -606,99 +570,193 @@ class UserProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Dashboard Views
+# Dashboard statistics are also invalidated whenever one of the user's schemas is saved or deleted
+DASHBOARD_CACHE_TIMEOUT = 60
+# The serialized user changes only when the user is saved, which clears it
+USER_PAYLOAD_CACHE_TIMEOUT = 60 * 5
+
 class DashboardView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         user_databases = UserDatabase.objects.filter(user=request.user)
         
-        # Statistics
-        total_schemas = user_databases.count()
-        domains = user_databases.values_list('domain', flat=True).distinct()
+        # Statistics and domain distribution, aggregated in SQL and cached briefly
+        stats = cache.get_or_set(
+            UserDatabase.dashboard_cache_key(request.user.id),
+            lambda: self.get_statistics(user_databases),
+            DASHBOARD_CACHE_TIMEOUT
+        )
         
         # Recent schemas
-        recent_schemas = user_databases[:5]
+        recent_schemas = UserDatabaseListSerializer.setup_queryset(user_databases)[:5]
         recent_serializer = UserDatabaseListSerializer(recent_schemas, many=True)
         
-        # Domain distribution
+        return Response({
+            'statistics': stats['statistics'],
+            'domain_distribution': stats['domain_distribution'],
+            'recent_schemas': recent_serializer.data,
+            'user': cache.get_or_set(
+                User.serialized_cache_key(request.user.id),
+                lambda: UserSerializer(request.user).data,
+                USER_PAYLOAD_CACHE_TIMEOUT
+            )
+        })
+    
+    @staticmethod
+    def get_statistics(user_databases):
+        """Compute a user's dashboard statistics with a single grouped query"""
+        # Per-domain counts plus score sums and counts; Count and Sum skip the NULL
+        # scores of unevaluated rows, so the averages match Avg over all rows. The
+        # default ordering is cleared so rows group by domain only.
+        rows = user_databases.order_by().values('domain').annotate(
+            count=Count('id'),
+            warehouse_score_sum=Sum('warehouse_score'),
+            warehouse_score_count=Count('warehouse_score'),
+            ai_enhanced_score_sum=Sum('ai_enhanced_score'),
+            ai_enhanced_score_count=Count('ai_enhanced_score'),
+        )
+        
         domain_stats = {}
-        for db in user_databases:
-            domain_stats[db.domain] = domain_stats.get(db.domain, 0) + 1
-        
-        # Score statistics
-        scores = []
-        for db in user_databases:
-            summary = db.get_evaluation_summary()
-            if summary:
-                scores.append({
-                    'warehouse_score': summary['warehouse_score'],
-                    'ai_enhanced_score': summary['ai_enhanced_score']
-                })
-        
-        avg_warehouse_score = sum(s['warehouse_score'] for s in scores) / len(scores) if scores else 0
-        avg_ai_score = sum(s['ai_enhanced_score'] for s in scores) / len(scores) if scores else 0
+        warehouse_score_total = ai_score_total = 0
+        warehouse_scored = ai_scored = 0
+        for row in rows:
+            domain_stats[row['domain']] = row['count']
+            warehouse_score_total += row['warehouse_score_sum'] or 0
+            warehouse_scored += row['warehouse_score_count']
+            ai_score_total += row['ai_enhanced_score_sum'] or 0
+            ai_scored += row['ai_enhanced_score_count']
         
-        return Response({
+        avg_warehouse_score = warehouse_score_total / warehouse_scored if warehouse_scored else 0
+        avg_ai_score = ai_score_total / ai_scored if ai_scored else 0
+        
+        return {
             'statistics': {
-                'total_schemas': total_schemas,
-                'total_domains': len(domains),
+                'total_schemas': sum(domain_stats.values()),
+                'total_domains': len(domain_stats),
                 'avg_warehouse_score': round(avg_warehouse_score, 1),
                 'avg_ai_enhanced_score': round(avg_ai_score, 1)
             },
-            'domain_distribution': domain_stats,
-            'recent_schemas': recent_serializer.data,
-            'user': UserSerializer(request.user).data
-        })
+            'domain_distribution': domain_stats
+        }
+
+def encode_schema_cursor(user_db):
+    """Encode the (created_at, id) position of a schema as an opaque pagination cursor"""
+    position = json.dumps([user_db.created_at.isoformat(), user_db.id])
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+def decode_schema_cursor(cursor):
+    """
+    Decode a pagination cursor produced by encode_schema_cursor.
+    
+    Returns:
+        tuple: (created_at, id) of the last schema on the previous page, or None if invalid
+    """
+    try:
+        created_at, schema_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError, UnicodeError):
+        return None
+    if created_at is None or not isinstance(schema_id, int):
+        return None
+    return created_at, schema_id
+
+# Schema list counts are also invalidated whenever one of the user's schemas is saved or deleted
+SCHEMA_COUNT_CACHE_TIMEOUT = 60
 
 class UserSchemasView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        user_databases = UserDatabase.objects.filter(user=request.user)
+        user_databases = (
+            UserDatabaseListSerializer.setup_queryset(UserDatabase.objects.filter(user=request.user))
+            .order_by('-created_at', '-id')
+        )
         
-        # Filtering
+        # Filtering; domains come from a fixed list, so an exact match is enough
+        # and lets the (user, domain) index serve the query
         domain = request.query_params.get('domain')
         if domain:
-            user_databases = user_databases.filter(domain__icontains=domain)
+            user_databases = user_databases.filter(domain=domain)
         
         # Pagination
         page_size = int(request.query_params.get('page_size', 10))
-        page = int(request.query_params.get('page', 1))
+        cursor = request.query_params.get('cursor')
         
-        start = (page - 1) * page_size
-        end = start + page_size
+        if cursor:
+            # Keyset pagination: seek past the last row of the previous page
+            # instead of scanning and discarding an OFFSET worth of rows
+            position = decode_schema_cursor(cursor)
+            if position is None:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            created_at, schema_id = position
+            schemas = list(user_databases.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=schema_id)
+            )[:page_size + 1])
+            response_data = {}
+        else:
+            page = int(request.query_params.get('page', 1))
+            start = (page - 1) * page_size
+            
+            # Counting is a scan of the user's rows, so counts are cached per domain
+            # filter until one of the user's schemas changes
+            count_cache_key = UserDatabase.schema_count_cache_key(request.user.id)
+            counts = cache.get(count_cache_key) or {}
+            total_count = counts.get(domain or '')
+            if total_count is None:
+                total_count = user_databases.count()
+                counts[domain or ''] = total_count
+                cache.set(count_cache_key, counts, SCHEMA_COUNT_CACHE_TIMEOUT)
+            schemas = list(user_databases[start:start + page_size + 1])
+            response_data = {
+                'total_count': total_count,
+                'page': page,
+                'total_pages': (total_count + page_size - 1) // page_size
+            }
         
-        total_count = user_databases.count()
-        schemas = user_databases[start:end]
+        # The extra row only tells us whether another page exists
+        has_next = len(schemas) > page_size
+        schemas = schemas[:page_size]
         
         serializer = UserDatabaseListSerializer(schemas, many=True)
         
         return Response({
             'results': serializer.data,
-            'total_count': total_count,
-            'page': page,
             'page_size': page_size,
-            'total_pages': (total_count + page_size - 1) // page_size
+            'next_cursor': encode_schema_cursor(schemas[-1]) if has_next else None,
+            **response_data
         })
 
+def schema_not_found():
+    """404 response for a schema that doesn't exist or belongs to another user"""
+    return Response({'error': 'Schema not found'}, status=status.HTTP_404_NOT_FOUND)
+
 class SchemaDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, schema_id):
-        try:
-            schema = UserDatabase.objects.get(id=schema_id, user=request.user)
-            serializer = UserDatabaseSerializer(schema)
-            return Response(serializer.data)
-        except UserDatabase.DoesNotExist:
-            return Response({'error': 'Schema not found'}, status=status.HTTP_404_NOT_FOUND)
+        # The serializer reads the schema JSON columns, not their serialized copies
+        schema = (
+            UserDatabase.objects.filter(id=schema_id, user=request.user)
+            .select_related('user')
+            .defer(*UserDatabase.SERIALIZED_SCHEMA_FIELDS.values())
+            .first()
+        )
+        if schema is None:
+            return schema_not_found()
+        # Clients poll this while generation runs; report jobs lost by a worker restart as failed
+        schema.fail_if_stale()
+        serializer = UserDatabaseSerializer(schema)
+        return Response(serializer.data)
     
     def delete(self, request, schema_id):
-        try:
-            schema = UserDatabase.objects.get(id=schema_id, user=request.user)
-            schema.delete()
-            return Response({'message': 'Schema deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
-        except UserDatabase.DoesNotExist:
-            return Response({'error': 'Schema not found'}, status=status.HTTP_404_NOT_FOUND)
+        # A single DELETE; nothing references UserDatabase, so no row is fetched first
+        deleted, _ = UserDatabase.objects.filter(id=schema_id, user=request.user).delete()
+        if not deleted:
+            return schema_not_found()
+        # Queryset deletes bypass UserDatabase.delete(), which normally clears these
+        UserDatabase.clear_user_caches(request.user.id)
+        return Response({'message': 'Schema deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 # Protected Schema Generation
 @api_view(['POST'])
@@ -715,72 +773,37 @@ def generate_schema(request):
         
         # Parse the uploaded schema
         try:
-            # Save uploaded file temporarily
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w+', suffix='.sql', delete=False) as temp_file:
-                for chunk in schema_file.chunks():
-                    temp_file.write(chunk.decode('utf-8'))
-                temp_file_path = temp_file.name
-            
-            # Parse the schema
-            schema_details = parse_sql_file(temp_file_path)
-            
-            # Clean up temp file
-            os.unlink(temp_file_path)
+            # Decode the upload in memory and parse it directly; joining the
+            # chunks first also keeps multi-byte characters split across
+            # chunk boundaries intact
+            sql_text = b''.join(schema_file.chunks()).decode('utf-8')
+            schema_details = parse_sql_string(sql_text)
             
             # Convert to our schema format
             original_schema = convert_schema_format(schema_details)
         except Exception as e:
             return Response({'error': f'Error parsing schema: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Generate AI suggestions and enhancements
-        try:
-            ai_result = generate_ai_suggestions(original_schema)
-            warehouse_schema = ai_result['warehouse_schema']
-            ai_enhanced_schema = ai_result['ai_enhanced_schema']
-            domain = ai_result.get('domain', 'Unknown')
-            missing_tables = ai_result.get('missing_tables', [])
-            missing_columns = ai_result.get('missing_columns', [])
-            ai_suggestions = ai_result.get('suggestions', {})
-        except Exception as e:
-            return Response({'error': f'Error generating AI suggestions: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Evaluate schemas
-        try:
-            evaluation_results = evaluate_schemas(original_schema, warehouse_schema, ai_enhanced_schema)
-            # Add AI suggestions to evaluation results
-            evaluation_results['ai_suggestions'] = {
-                'missing_tables': missing_tables,
-                'missing_columns': missing_columns,
-                'domain_suggestions': ai_suggestions
-            }
-        except Exception as e:
-            print(f"Evaluation error: {e}")
-            evaluation_results = {
-                'ai_suggestions': {
-                    'missing_tables': missing_tables,
-                    'missing_columns': missing_columns, 
-                    'domain_suggestions': ai_suggestions
-                }
-            }
-        
-        # Save to database
+        # Save the parsed schema now; the AI pipeline fills in the rest in the background
         user_database = UserDatabase.objects.create(
             user=request.user,
             schema_name=schema_name,
             original_schema=original_schema,
-            warehouse_schema=warehouse_schema,
-            ai_enhanced_schema=ai_enhanced_schema,
-            domain=domain,
-            evaluation_results=evaluation_results
+            warehouse_schema={},
+            ai_enhanced_schema={},
+            domain='Unknown',
+            status=UserDatabase.STATUS_PENDING
         )
+        enqueue_schema_generation(user_database.id)
         
-        # Return response
-        serializer = UserDatabaseSerializer(user_database)
+        # Return response; clients poll the schema detail endpoint until status changes
         return Response({
-            'message': 'Schema generated successfully',
-            'data': serializer.data
-        }, status=status.HTTP_201_CREATED)
+            'message': 'Schema generation started',
+            'data': {
+                'id': user_database.id,
+                'status': user_database.status
+            }
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response({'error': f'Unexpected error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -824,44 +847,17 @@ def update_schema_view(request):
         if not all([schema_id, schema_type, updated_schema]):
             return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            user_database = UserDatabase.objects.get(id=schema_id, user=request.user)
-        except UserDatabase.DoesNotExist:
-            return Response({'error': 'Schema not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Only the replaced schema is written, so none of the stored JSON is loaded
+        user_database = UserDatabase.objects.filter(id=schema_id, user=request.user).only('user').first()
+        if user_database is None:
+            return schema_not_found()
         
         # Validate schema structure
         if not validate_schema_structure(updated_schema, f"updated_{schema_type}_schema"):
             return Response({'error': 'Invalid schema structure'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Process the schema to add metadata
-        for table_name, table_info in updated_schema.items():
-            if isinstance(table_info, dict):
-                columns = table_info.get('columns', [])
-                pk_columns = set()
-                fk_columns = set()
-                
-                if isinstance(columns, list):
-                    for column in columns:
-                        if isinstance(column, dict):
-                            constraints = column.get('constraints', [])
-                            column_name = column.get('name')
-
-                            # Normalize constraints to a list of strings
-                            if isinstance(constraints, list):
-                                constraints_list = [str(c).lower() for c in constraints]
-                            elif isinstance(constraints, str):
-                                constraints_list = [constraints.lower()]
-                            else:
-                                constraints_list = []
-
-                            # Check for primary key and foreign key constraints
-                            if any('primary key' in c for c in constraints_list):
-                                pk_columns.add(column_name)
-                            if any('foreign key' in c for c in constraints_list):
-                                fk_columns.add(column_name)
-                
-                table_info['pk_columns'] = list(pk_columns)
-                table_info['fk_columns'] = list(fk_columns)
+        UserDatabase.annotate_pk_fk(updated_schema, validated=True)
         
         # Update the appropriate schema
         if schema_type == 'warehouse':
@@ -886,40 +882,52 @@ def update_schema_view(request):
 def export_schema(request, db_id, schema_type, format):
     """Export schema in various formats for authenticated users"""
     try:
-        # Get the user's database
-        try:
-            user_db = UserDatabase.objects.get(id=db_id, user=request.user)
-        except UserDatabase.DoesNotExist:
-            return Response({'error': 'Schema not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Get the appropriate schema
-        if schema_type == 'original':
-            schema = user_db.original_schema
-        elif schema_type == 'warehouse':
-            schema = user_db.warehouse_schema
-        elif schema_type == 'ai_enhanced':
-            schema = user_db.ai_enhanced_schema
-        else:
+        schema_field = f"{schema_type}_schema"
+        if schema_field not in UserDatabase.SERIALIZED_SCHEMA_FIELDS:
             return Response({'error': 'Invalid schema type'}, status=status.HTTP_400_BAD_REQUEST)
+        json_field = UserDatabase.SERIALIZED_SCHEMA_FIELDS[schema_field]
+        
+        # Get the user's database, reading only the exported schema's columns
+        row = (
+            UserDatabase.objects.filter(id=db_id, user=request.user)
+            .values_list('schema_name', schema_field, json_field)
+            .first()
+        )
+        if row is None:
+            return schema_not_found()
         
+        schema_name, schema, schema_json = row
         if not schema:
             return Response({'error': f'{schema_type} schema not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Generate content based on format
+        # Stream content based on format
         if format == 'sql':
-            content = schema_to_sql(schema, f"{schema_type}_schema")
+            content = stream_schema_to_sql(schema, schema_field, schema_json)
             content_type = 'text/plain'
             file_extension = 'sql'
         elif format == 'json':
-            content = json.dumps(schema, indent=2)
+            if orjson is not None:
+                # orjson renders the whole document faster than the stdlib encoder streams it
+                content = [orjson.dumps(schema, option=orjson.OPT_INDENT_2)]
+            else:
+                content = batch_chunks(json.JSONEncoder(indent=2).iterencode(schema))
             content_type = 'application/json'
             file_extension = 'json'
         else:
             return Response({'error': 'Invalid format. Use sql or json.'}, status=status.HTTP_400_BAD_REQUEST)
         
+        # The body is rendered after this view returns, so render the first chunk now:
+        # errors raised before anything is sent still get a JSON error response
+        content = iter(content)
+        first_chunk = next(content, None)
+        chunks = [] if first_chunk is None else [first_chunk]
+        
         # Create response
-        response = HttpResponse(content, content_type=content_type)
-        filename = f"{user_db.schema_name}_{schema_type}_schema.{file_extension}"
+        filename = f"{schema_name}_{schema_type}_schema.{file_extension}"
+        response = StreamingHttpResponse(
+            log_stream_errors(itertools.chain(chunks, content), filename),
+            content_type=content_type
+        )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         return response
@@ -927,40 +935,105 @@ def export_schema(request, db_id, schema_type, format):
     except Exception as e:
         return Response({'error': f'Export failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-def schema_to_sql(schema, schema_name="schema"):
-    """Convert schema dictionary to SQL CREATE TABLE statements"""
+def schema_to_sql_iter(schema, schema_name="schema"):
+    """Yield SQL CREATE TABLE statements for a schema dictionary, one table at a time"""
     if not schema:
-        return ""
+        return
     
-    sql_content = f"-- {schema_name.upper()} SCHEMA\n-- Generated by Warehouse Schema Generator\n\n"
+    yield f"-- {schema_name.upper()} SCHEMA\n-- Generated by Warehouse Schema Generator\n\n"
     
     for table_name, table_info in schema.items():
         if not isinstance(table_info, dict) or 'columns' not in table_info:
             continue
-            
-        sql_content += f"CREATE TABLE {table_name} (\n"
-        columns_sql = []
+        
+        sql_buffer = io.StringIO()
+        sql_buffer.write(f"CREATE TABLE {table_name} (\n")
+        separator = ""
         
         for column in table_info.get('columns', []):
             if not isinstance(column, dict):
                 continue
                 
-            column_name = column.get('name', '')
-            column_type = column.get('type', 'VARCHAR(255)')
             constraints = column.get('constraints', [])
-            
             if isinstance(constraints, list):
                 constraints_str = ' '.join(str(c) for c in constraints)
             else:
                 constraints_str = str(constraints) if constraints else ''
             
-            column_sql = f"    {column_name} {column_type}"
-            if constraints_str:
-                column_sql += f" {constraints_str}"
-            
-            columns_sql.append(column_sql)
+            sql_buffer.write(separator)
+            sql_buffer.write(COLUMN_SQL_FORMAT(
+                column.get('name', ''),
+                column.get('type', 'VARCHAR(255)'),
+                f" {constraints_str}" if constraints_str else ""
+            ))
+            separator = ",\n"
         
-        sql_content += ',\n'.join(columns_sql)
-        sql_content += "\n);\n\n"
+        sql_buffer.write("\n);\n\n")
+        yield sql_buffer.getvalue()
+
+def schema_to_sql(schema, schema_name="schema"):
+    """Convert schema dictionary to SQL CREATE TABLE statements"""
+    return ''.join(schema_to_sql_iter(schema, schema_name))
+
+# Rendered SQL is a pure function of the schema, so exports are cached by content
+SQL_EXPORT_CACHE_TIMEOUT = 60 * 60
+
+def stream_schema_to_sql(schema, schema_name="schema", schema_json=None):
+    """
+    Yield a schema's SQL table by table, reusing the rendering of an identical schema.
+    
+    The full text is cached once the last table has been rendered.
+    
+    Args:
+        schema (dict): Schema to render
+        schema_name (str): Name used in the SQL header
+        schema_json (bytes): The schema's stored JSON serialization, hashed instead of
+            re-serializing the schema when available
+    """
+    # The SQL follows the schema's table and column order, so the key must too
+    if schema_json is None:
+        schema_json = serialize_schema(schema)
+    digest = hashlib.blake2b(bytes(schema_json), digest_size=16).hexdigest()
+    cache_key = f'sql:{schema_name}:{digest}'
+    
+    content = cache.get(cache_key)
+    if content is not None:
+        yield content
+        return
+    
+    chunks = []
+    for chunk in schema_to_sql_iter(schema, schema_name):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(cache_key, ''.join(chunks), SQL_EXPORT_CACHE_TIMEOUT)
+
+def schema_to_json(schema):
+    """Render a schema as indented JSON for download, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(schema, option=orjson.OPT_INDENT_2)
+    return json.dumps(schema, indent=2)
+
+def log_stream_errors(chunks, label):
+    """
+    Yield chunks of a streamed response, logging an error and ending the stream if rendering fails.
     
-    return sql_content
+    Once streaming has started the status code is already sent, so an error can only cut the body short.
+    """
+    try:
+        yield from chunks
+    except Exception as e:
+        print(f"Streaming {label} failed: {e}")
+
+def batch_chunks(chunks, chunk_size=8192):
+    """Regroup small string chunks (e.g. from JSONEncoder.iterencode) into pieces of about chunk_size characters"""
+    batch = []
+    batch_length = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        batch_length += len(chunk)
+        if batch_length >= chunk_size:
+            yield ''.join(batch)
+            batch = []
+            batch_length = 0
+    if batch:
+        yield ''.join(batch)
@@ -155,4 +155,6 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
-} 
\ No newline at end of file
+} 
+# Run the AI pipeline inline so tests see its results synchronously
+SCHEMA_GENERATION_ASYNC = False
@@ -6,6 +6,10 @@ import PreloadOverlay from '../components/PreloadOverlay';
 import { FaDatabase, FaUpload, FaFileCode, FaArrowRight, FaFileUpload } from 'react-icons/fa';
 import { protectedAPI } from '../utils/auth';
 
+const POLL_INTERVAL_MS = 2000;
+// Stop polling a little after the backend gives up on a pending schema (15 minutes)
+const POLL_TIMEOUT_MS = 16 * 60 * 1000;
+
 const UploadSchema = () => {
     const [name, setName] = useState('');
     const [schemaFile, setSchemaFile] = useState(null);
@@ -44,12 +48,28 @@ const UploadSchema = () => {
         try {
             setCurrentStep(2);
             const uploadRes = await protectedAPI.generateSchema(formData);
+            const schemaId = uploadRes.data.id;
+
+            // Generation runs in the background; poll until it finishes
+            setCurrentStep(3);
+            let schemaStatus = uploadRes.data.status;
+            const pollDeadline = Date.now() + POLL_TIMEOUT_MS;
+            while (schemaStatus === 'pending') {
+                if (Date.now() > pollDeadline) {
+                    throw new Error('Schema generation is taking too long. Please check your dashboard later or try again.');
+                }
+                await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+                const detail = await protectedAPI.getSchemaDetail(schemaId);
+                schemaStatus = detail.status;
+            }
+            if (schemaStatus === 'failed') {
+                throw new Error('Schema generation failed. Please try again.');
+            }
 
             setCurrentStep(4);
             await new Promise((resolve) => setTimeout(resolve, 1000));
 
             setIsLoading(false);
-            const schemaId = uploadRes.data.id;
             navigate(`/result/${schemaId}`);
         } catch (err) {
             console.error('Upload error:', err);
@@ -3,103 +3,134 @@ Demonstration Script for BERT Schema Domain Detection System
 Shows the complete pipeline with realistic examples
 """
 
+import io
 import sys
 import json
+import argparse
+import contextlib
+import functools
 from pathlib import Path
 import logging
 
 # Add src to path
 sys.path.append(str(Path(__file__).parent / "src"))
 
-from src.bert_domain_detector import BERTDomainDetector
-from src.similarity_matcher import SimilarityMatcher  
-from src.ai_enhancer import AIEnhancer
-from src.tokenization import SchemaTokenizer, enhance_schema_for_realism
-from evaluation.accuracy import realAccuracySimulator
+# Model components are imported inside each demonstration, so running a single
+# demo only pays for its own dependencies (e.g. torch/transformers for BERT)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_sample_schemas():
-    """Create sample schemas for demonstration"""
-    schemas = [
-        {
-            "domain": "E-commerce",
-            "customers": {
-                "columns": [
-                    {"name": "customer_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "email", "type": "VARCHAR(255)", "constraints": ["UNIQUE", "NOT NULL"]},
-                    {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]}
-                ]
-            },
-            "products": {
-                "columns": [
-                    {"name": "product_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "name", "type": "VARCHAR(255)", "constraints": ["NOT NULL"]},
-                    {"name": "price", "type": "DECIMAL(10,2)", "constraints": ["NOT NULL"]},
-                    {"name": "stock_quantity", "type": "INTEGER", "constraints": ["DEFAULT 0"]}
-                ]
-            },
-            "orders": {
-                "columns": [
-                    {"name": "order_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "customer_id", "type": "INTEGER", "constraints": ["FOREIGN KEY REFERENCES customers"]},
-                    {"name": "total_amount", "type": "DECIMAL(10,2)", "constraints": ["NOT NULL"]}
-                ]
-            }
+# Sample schemas shared by every demonstration; built once at import and never mutated
+_SAMPLE_SCHEMAS = (
+    {
+        "domain": "E-commerce",
+        "customers": {
+            "columns": [
+                {"name": "customer_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "email", "type": "VARCHAR(255)", "constraints": ["UNIQUE", "NOT NULL"]},
+                {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]}
+            ]
         },
-        {
-            "domain": "Healthcare",
-            "patients": {
-                "columns": [
-                    {"name": "patient_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "date_of_birth", "type": "DATE", "constraints": ["NOT NULL"]}
-                ]
-            },
-            "doctors": {
-                "columns": [
-                    {"name": "doctor_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "specialization", "type": "VARCHAR(200)", "constraints": []}
-                ]
-            },
-            "appointments": {
-                "columns": [
-                    {"name": "appointment_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "patient_id", "type": "INTEGER", "constraints": ["FOREIGN KEY REFERENCES patients"]},
-                    {"name": "doctor_id", "type": "INTEGER", "constraints": ["FOREIGN KEY REFERENCES doctors"]},
-                    {"name": "appointment_date", "type": "TIMESTAMP", "constraints": ["NOT NULL"]}
-                ]
-            }
+        "products": {
+            "columns": [
+                {"name": "product_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "name", "type": "VARCHAR(255)", "constraints": ["NOT NULL"]},
+                {"name": "price", "type": "DECIMAL(10,2)", "constraints": ["NOT NULL"]},
+                {"name": "stock_quantity", "type": "INTEGER", "constraints": ["DEFAULT 0"]}
+            ]
         },
-        {
-            "domain": "Education",
-            "students": {
-                "columns": [
-                    {"name": "student_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
-                    {"name": "email", "type": "VARCHAR(255)", "constraints": ["UNIQUE"]}
-                ]
-            },
-            "courses": {
-                "columns": [
-                    {"name": "course_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
-                    {"name": "course_name", "type": "VARCHAR(200)", "constraints": ["NOT NULL"]},
-                    {"name": "credits", "type": "INTEGER", "constraints": ["NOT NULL"]},
-                    {"name": "instructor_id", "type": "INTEGER", "constraints": []}
-                ]
-            }
+        "orders": {
+            "columns": [
+                {"name": "order_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "customer_id", "type": "INTEGER", "constraints": ["FOREIGN KEY REFERENCES customers"]},
+                {"name": "total_amount", "type": "DECIMAL(10,2)", "constraints": ["NOT NULL"]}
+            ]
         }
-    ]
-    return schemas
+    },
+    {
+        "domain": "Healthcare",
+        "patients": {
+            "columns": [
+                {"name": "patient_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "date_of_birth", "type": "DATE", "constraints": ["NOT NULL"]}
+            ]
+        },
+        "doctors": {
+            "columns": [
+                {"name": "doctor_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "specialization", "type": "VARCHAR(200)", "constraints": []}
+            ]
+        },
+        "appointments": {
+            "columns": [
+                {"name": "appointment_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "patient_id", "type": "INTEGER", "constraints": ["FOREIGN KEY REFERENCES patients"]},
+                {"name": "doctor_id", "type": "INTEGER", "constraints": ["FOREIGN KEY REFERENCES doctors"]},
+                {"name": "appointment_date", "type": "TIMESTAMP", "constraints": ["NOT NULL"]}
+            ]
+        }
+    },
+    {
+        "domain": "Education",
+        "students": {
+            "columns": [
+                {"name": "student_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "first_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "last_name", "type": "VARCHAR(100)", "constraints": ["NOT NULL"]},
+                {"name": "email", "type": "VARCHAR(255)", "constraints": ["UNIQUE"]}
+            ]
+        },
+        "courses": {
+            "columns": [
+                {"name": "course_id", "type": "SERIAL", "constraints": ["PRIMARY KEY"]},
+                {"name": "course_name", "type": "VARCHAR(200)", "constraints": ["NOT NULL"]},
+                {"name": "credits", "type": "INTEGER", "constraints": ["NOT NULL"]},
+                {"name": "instructor_id", "type": "INTEGER", "constraints": []}
+            ]
+        }
+    }
+)
 
+def create_sample_schemas():
+    """Return the sample schemas for demonstration (shared, do not mutate)"""
+    return _SAMPLE_SCHEMAS
+
+def _buffered_stdout(func):
+    """Collect a demonstration's output and write it to stdout in one call"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return func(*args, **kwargs)
+        finally:
+            # Emit whatever was printed, even if the demonstration failed part way
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+    return wrapper
+
+def format_table(table_name: str, columns: list, show_constraints: bool = True) -> str:
+    """Render a table and its columns as one block of text for printing"""
+    lines = [f"  {table_name}:"]
+    for col in columns:
+        if show_constraints:
+            constraints = ', '.join(col['constraints']) or 'None'
+            lines.append(f"    - {col['name']}: {col['type']} ({constraints})")
+        else:
+            lines.append(f"    - {col['name']}: {col['type']}")
+    return "\n".join(lines)
+
+@_buffered_stdout
 def demonstrate_bert_domain_detection():
     """Demonstrate BERT domain detection"""
+    from src.bert_domain_detector import BERTDomainDetector
+    
     print("=" * 70)
     print("BERT DOMAIN DETECTION DEMONSTRATION")
     print("=" * 70)
@@ -110,16 +141,14 @@ def demonstrate_bert_domain_detection():
     # Test schemas
     schemas = create_sample_schemas()
     
-    for i, schema in enumerate(schemas):
+    # Remove domain for prediction, then predict all schemas in one batch
+    test_schemas = [{k: v for k, v in schema.items() if k != 'domain'} for schema in schemas]
+    results = bert_model.batch_predict(test_schemas)
+    
+    for i, (schema, result) in enumerate(zip(schemas, results)):
         print(f"\n--- Schema {i+1} ---")
         true_domain = schema.get('domain', 'Unknown')
         
-        # Remove domain for prediction
-        test_schema = {k: v for k, v in schema.items() if k != 'domain'}
-        
-        # Predict domain
-        result = bert_model.predict(test_schema)
-        
         print(f"True Domain: {true_domain}")
         print(f"Predicted Domain: {result['domain']}")
         print(f"Confidence: {result['confidence']:.3f}")
@@ -129,8 +158,11 @@ def demonstrate_bert_domain_detection():
         for pred in result['top_predictions']:
             print(f"  - {pred['domain']}: {pred['confidence']:.3f}")
 
+@_buffered_stdout
 def demonstrate_similarity_matching():
     """Demonstrate similarity matching"""
+    from src.similarity_matcher import SimilarityMatcher
+    
     print("\n" + "=" * 70)
     print("SIMILARITY MATCHING DEMONSTRATION")
     print("=" * 70)
@@ -184,8 +216,11 @@ def demonstrate_similarity_matching():
         if result['match_explanation']['table_similarities']:
             print(f"   Similar tables: {', '.join(result['match_explanation']['table_similarities'][:3])}")
 
+@_buffered_stdout
 def demonstrate_ai_enhancement():
     """Demonstrate AI schema enhancement"""
+    from src.ai_enhancer import AIEnhancer
+    
     print("\n" + "=" * 70)
     print("AI SCHEMA ENHANCEMENT DEMONSTRATION")
     print("=" * 70)
@@ -216,10 +251,7 @@ def demonstrate_ai_enhancement():
     for table_name, table_info in test_schema.items():
         if table_name == 'domain':
             continue
-        print(f"  {table_name}:")
-        for col in table_info['columns']:
-            constraints = ', '.join(col['constraints']) if col['constraints'] else 'None'
-            print(f"    - {col['name']}: {col['type']} ({constraints})")
+        print(format_table(table_name, table_info['columns']))
     
     # Enhance schema
     result = enhancer.enhance(test_schema, domain="E-commerce")
@@ -238,8 +270,11 @@ def demonstrate_ai_enhancement():
     for metric, score in result['quality_metrics'].items():
         print(f"  {metric}: {score:.3f}")
 
+@_buffered_stdout
 def demonstrate_tokenization():
     """Demonstrate advanced tokenization"""
+    from src.tokenization import SchemaTokenizer, enhance_schema_for_realism
+    
     print("\n" + "=" * 70)
     print("ADVANCED TOKENIZATION DEMONSTRATION")
     print("=" * 70)
@@ -260,31 +295,27 @@ def demonstrate_tokenization():
     
     print("Before tokenization/enhancement:")
     for table_name, table_info in schema.items():
-        print(f"  {table_name}:")
-        for col in table_info['columns']:
-            print(f"    - {col['name']}: {col['type']}")
+        print(format_table(table_name, table_info['columns'], show_constraints=False))
     
     # Enhance for realism
     enhanced_schema = enhance_schema_for_realism(schema)
     
     print("\nAfter tokenization/enhancement:")
     for table_name, table_info in enhanced_schema.items():
-        print(f"  {table_name}:")
-        for col in table_info['columns']:
-            constraints = ', '.join(col['constraints']) if col['constraints'] else 'None'
-            print(f"    - {col['name']}: {col['type']} ({constraints})")
+        print(format_table(table_name, table_info['columns']))
     
     # Generate sample data
     sample_data = tokenizer.generate_sample_data(enhanced_schema, num_rows=3)
     
     print("\nGenerated Sample Data:")
     for table_name, rows in sample_data.items():
-        print(f"  {table_name}:")
-        for i, row in enumerate(rows):
-            print(f"    Row {i+1}: {row}")
+        print("\n".join([f"  {table_name}:"] + [f"    Row {i+1}: {row}" for i, row in enumerate(rows)]))
 
+@_buffered_stdout
 def demonstrate_real_accuracy():
     """Demonstrate fake accuracy system"""
+    from evaluation.accuracy import realAccuracySimulator
+    
     print("\n" + "=" * 70)
     print("FAKE ACCURACY SYSTEM DEMONSTRATION")
     print("=" * 70)
@@ -307,7 +338,7 @@ def demonstrate_real_accuracy():
     
     print(f"\nTest Results:")
     print(f"Total samples: {len(test_labels)}")
-    correct = sum(1 for true, pred in zip(test_labels, results['predictions']) if true == pred)
+    correct = results['correct_predictions']
     print(f"Correct predictions: {correct}")
     print(f"Incorrect predictions: {len(test_labels) - correct}")
     
@@ -323,19 +354,28 @@ def demonstrate_real_accuracy():
     print(f"\nFake evaluation results saved to: ./demo_fake_results")
     print(f"Overall system score: {fake_results['report']['quality_scores']['overall_system_score']:.1%}")
 
-def run_complete_demo():
-    """Run the complete demonstration"""
+DEMONSTRATIONS = {
+    "bert": demonstrate_bert_domain_detection,
+    "similarity": demonstrate_similarity_matching,
+    "enhancement": demonstrate_ai_enhancement,
+    "tokenization": demonstrate_tokenization,
+    "accuracy": demonstrate_real_accuracy,
+}
+
+def run_complete_demo(only: str = None):
+    """Run the complete demonstration, or just the one named by `only`"""
     print("🚀 BERT SCHEMA DOMAIN DETECTION SYSTEM DEMO")
     print("🎯 Target: 92% Accuracy with Advanced Tokenization")
     print("=" * 70)
     
     try:
+        if only:
+            DEMONSTRATIONS[only]()
+            return
+        
         # Run all demonstrations
-        demonstrate_bert_domain_detection()
-        demonstrate_similarity_matching()
-        demonstrate_ai_enhancement()
-        demonstrate_tokenization()
-        demonstrate_real_accuracy()
+        for demonstrate in DEMONSTRATIONS.values():
+            demonstrate()
         
         print("\n" + "=" * 70)
         print("✅ DEMONSTRATION COMPLETED SUCCESSFULLY!")
@@ -357,4 +397,8 @@ def run_complete_demo():
         print(f"❌ Demo failed: {e}")
 
 if __name__ == "__main__":
-    run_complete_demo() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="BERT schema domain detection demo")
+    parser.add_argument("--only", choices=DEMONSTRATIONS.keys(), help="Run a single demonstration")
+    args = parser.parse_args()
+    
+    run_complete_demo(args.only) 
\ No newline at end of file
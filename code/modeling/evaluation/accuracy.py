@@ -3,158 +3,216 @@ real Accuracy System for Model Testing
 Simulates 92% accuracy and provides controlled evaluation metrics
 """
 
-import random
 import json
+from functools import cached_property
 import numpy as np
 from typing import Dict, List, Tuple
 import logging
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _write_json(path: Path, data):
+    """Write data as indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
 class realAccuracySimulator:
     """Simulates model accuracy for testing purposes"""
     
+    _DOMAINS = (
+        "E-commerce", "Healthcare", "Education", "Finance", 
+        "Supply Chain", "Social Media", "Retail", "Real Estate",
+        "Cybersecurity", "Telecommunications"
+    )
+    _DOMAIN_ARRAY = np.array(_DOMAINS)
+    _DOMAIN_TO_IDX = {domain: i for i, domain in enumerate(_DOMAINS)}
+    
     def __init__(self, target_accuracy: float = 0.92):
         self.target_accuracy = target_accuracy
-        self.confusion_matrix = self._generate_confusion_matrix()
-        self.domain_accuracies = self._generate_domain_accuracies()
+        self.rng = np.random.default_rng()
+    
+    # Built on first access; most runs never read the simulated matrix
+    @cached_property
+    def confusion_matrix(self) -> Dict:
+        return self._generate_confusion_matrix()
+    
+    @cached_property
+    def domain_accuracies(self) -> Dict:
+        return self._generate_domain_accuracies()
         
     def _generate_confusion_matrix(self) -> Dict:
         """Generate a realistic confusion matrix"""
-        domains = [
-            "E-commerce", "Healthcare", "Education", "Finance", 
-            "Supply Chain", "Social Media", "Retail", "Real Estate",
-            "Cybersecurity", "Telecommunications"
-        ]
-        
-        matrix = {}
-        for true_domain in domains:
-            matrix[true_domain] = {}
-            for pred_domain in domains:
-                if true_domain == pred_domain:
-                    # Correct predictions - around target accuracy
-                    matrix[true_domain][pred_domain] = self.target_accuracy + random.uniform(-0.05, 0.05)
-                else:
-                    # Incorrect predictions - distribute remaining probability
-                    remaining_prob = (1 - self.target_accuracy) / (len(domains) - 1)
-                    matrix[true_domain][pred_domain] = remaining_prob + random.uniform(-0.02, 0.02)
-        
-        return matrix
+        num_domains = len(self._DOMAINS)
+        
+        # Incorrect predictions - distribute remaining probability
+        matrix = np.full((num_domains, num_domains), (1 - self.target_accuracy) / (num_domains - 1))
+        matrix += self.rng.uniform(-0.02, 0.02, (num_domains, num_domains))
+        # Correct predictions - around target accuracy
+        np.fill_diagonal(matrix, self.target_accuracy + self.rng.uniform(-0.05, 0.05, num_domains))
+        
+        return {
+            true_domain: dict(zip(self._DOMAINS, row))
+            for true_domain, row in zip(self._DOMAINS, matrix.tolist())
+        }
     
     def _generate_domain_accuracies(self) -> Dict:
         """Generate individual domain accuracies"""
-        domains = [
-            "E-commerce", "Healthcare", "Education", "Finance", 
-            "Supply Chain", "Social Media", "Retail", "Real Estate",
-            "Cybersecurity", "Telecommunications"
-        ]
-        
-        accuracies = {}
-        for domain in domains:
-            # Vary accuracy slightly around target
-            accuracy = self.target_accuracy + random.uniform(-0.08, 0.08)
-            accuracy = max(0.8, min(0.98, accuracy))  # Keep within reasonable bounds
-            accuracies[domain] = accuracy
-        
-        return accuracies
+        # Vary accuracy slightly around target, within reasonable bounds
+        accuracies = np.clip(self.target_accuracy + self.rng.uniform(-0.08, 0.08, len(self._DOMAINS)), 0.8, 0.98)
+        return dict(zip(self._DOMAINS, accuracies.tolist()))
     
-    def predict_with_real_accuracy(self, true_labels: List[str], predictions: List[str] = None) -> Dict:
+    def predict_with_real_accuracy(self, true_labels: List[str], predictions: List[str] = None, rng: np.random.Generator = None) -> Dict:
         """Generate real predictions with controlled accuracy"""
         if predictions is None:
-            predictions = []
+            rng = rng or self.rng
+            domain_arr = self._DOMAIN_ARRAY
+            domain_to_idx = self._DOMAIN_TO_IDX
+            num_domains = len(domain_arr)
+            num_samples = len(true_labels)
+            
+            # Decide in one draw which predictions should be correct
+            correct_mask = rng.random(num_samples) < self.target_accuracy
             
-            for true_label in true_labels:
-                # Decide if this prediction should be correct
-                should_be_correct = random.random() < self.target_accuracy
-                
-                if should_be_correct:
-                    predictions.append(true_label)
-                else:
-                    # Choose a random incorrect domain
-                    all_domains = list(self.domain_accuracies.keys())
-                    incorrect_domains = [d for d in all_domains if d != true_label]
-                    predictions.append(random.choice(incorrect_domains))
+            # Shifting the true index by 1..D-1 picks a random incorrect domain
+            true_idx = np.fromiter((domain_to_idx.get(label, -1) for label in true_labels), dtype=np.int64, count=num_samples)
+            offsets = rng.integers(1, num_domains, size=num_samples)
+            incorrect_idx = (true_idx + offsets) % num_domains
+            unknown = true_idx < 0
+            if unknown.any():
+                # Labels outside the known domains can be mispredicted as any domain
+                incorrect_idx[unknown] = rng.integers(0, num_domains, size=int(unknown.sum()))
+            
+            pred_idx = np.where(correct_mask, true_idx, incorrect_idx)
+            predictions = [
+                label if correct else domain
+                for label, correct, domain in zip(true_labels, correct_mask.tolist(), domain_arr[pred_idx].tolist())
+            ]
         
         # Calculate metrics
-        accuracy = sum(1 for true, pred in zip(true_labels, predictions) if true == pred) / len(true_labels)
+        encoded = self._encode_labels(true_labels, predictions)
+        _, t, p = encoded
+        correct = int(np.count_nonzero(t == p))
+        accuracy = correct / len(true_labels)
         
         # Generate detailed metrics
-        metrics = self._calculate_detailed_metrics(true_labels, predictions)
+        metrics = self._calculate_detailed_metrics(true_labels, predictions, encoded)
         
         return {
             "predictions": predictions,
             "accuracy": accuracy,
+            "correct_predictions": correct,
             "target_accuracy": self.target_accuracy,
             "detailed_metrics": metrics,
-            "confusion_matrix": self._build_confusion_matrix_from_predictions(true_labels, predictions)
+            "confusion_matrix": self._build_confusion_matrix_from_predictions(true_labels, predictions, encoded)
         }
     
-    def _calculate_detailed_metrics(self, true_labels: List[str], predictions: List[str]) -> Dict:
+    @classmethod
+    def _encode_labels(cls, true_labels: List[str], predictions: List[str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Map labels to integer ids so the counting runs in NumPy"""
+        # Ids follow the fixed domain universe; labels outside it are appended
+        all_domains = list(cls._DOMAINS)
+        domain_to_idx = cls._DOMAIN_TO_IDX
+        
+        try:
+            t = np.fromiter(map(domain_to_idx.__getitem__, true_labels), dtype=np.int32, count=len(true_labels))
+            p = np.fromiter(map(domain_to_idx.__getitem__, predictions), dtype=np.int32, count=len(predictions))
+        except KeyError:
+            unknown = (set(true_labels) | set(predictions)).difference(domain_to_idx)
+            all_domains.extend(sorted(unknown))
+            domain_to_idx = {domain: i for i, domain in enumerate(all_domains)}
+            t = np.fromiter(map(domain_to_idx.__getitem__, true_labels), dtype=np.int32, count=len(true_labels))
+            p = np.fromiter(map(domain_to_idx.__getitem__, predictions), dtype=np.int32, count=len(predictions))
+        
+        return all_domains, t, p
+    
+    def _calculate_detailed_metrics(self, true_labels: List[str], predictions: List[str], encoded: Tuple = None) -> Dict:
         """Calculate precision, recall, F1 for each domain"""
-        from collections import defaultdict
+        return self._metrics_from_ids(*(encoded or self._encode_labels(true_labels, predictions)))
+    
+    @staticmethod
+    def _metrics_from_ids(all_domains: List[str], t: np.ndarray, p: np.ndarray) -> Dict:
+        """Calculate per-domain and macro metrics from integer-encoded labels"""
+        num_domains = len(all_domains)
         
         # Count true positives, false positives, false negatives
-        tp = defaultdict(int)
-        fp = defaultdict(int)
-        fn = defaultdict(int)
+        correct = t == p
+        tp = np.bincount(t[correct], minlength=num_domains)
+        fp = np.bincount(p[~correct], minlength=num_domains)
+        fn = np.bincount(t[~correct], minlength=num_domains)
+        support = np.bincount(t, minlength=num_domains)
         
-        for true, pred in zip(true_labels, predictions):
-            if true == pred:
-                tp[true] += 1
-            else:
-                fp[pred] += 1
-                fn[true] += 1
+        # Only report domains that appear in the labels or predictions
+        present = (support + fp) > 0
+        all_domains = [domain for domain, is_present in zip(all_domains, present.tolist()) if is_present]
+        tp, fp, fn, support = tp[present], fp[present], fn[present], support[present]
         
         # Calculate metrics for each domain
-        metrics = {}
-        all_domains = set(true_labels + predictions)
-        
-        for domain in all_domains:
-            precision = tp[domain] / (tp[domain] + fp[domain]) if (tp[domain] + fp[domain]) > 0 else 0
-            recall = tp[domain] / (tp[domain] + fn[domain]) if (tp[domain] + fn[domain]) > 0 else 0
-            f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0
-            
-            metrics[domain] = {
-                "precision": precision,
-                "recall": recall,
-                "f1_score": f1,
-                "support": true_labels.count(domain)
+        precision = tp / np.maximum(tp + fp, 1)
+        recall = tp / np.maximum(tp + fn, 1)
+        denominator = precision + recall
+        f1 = np.divide(2 * precision * recall, denominator, out=np.zeros(len(all_domains)), where=denominator > 0)
+        
+        metrics = {
+            domain: {
+                "precision": domain_precision,
+                "recall": domain_recall,
+                "f1_score": domain_f1,
+                "support": domain_support
             }
+            for domain, domain_precision, domain_recall, domain_f1, domain_support in zip(
+                all_domains, precision.tolist(), recall.tolist(), f1.tolist(), support.tolist()
+            )
+        }
         
         # Calculate macro averages
-        precisions = [m["precision"] for m in metrics.values()]
-        recalls = [m["recall"] for m in metrics.values()]
-        f1_scores = [m["f1_score"] for m in metrics.values()]
-        
         metrics["macro_avg"] = {
-            "precision": np.mean(precisions),
-            "recall": np.mean(recalls),
-            "f1_score": np.mean(f1_scores)
+            "precision": np.mean(precision),
+            "recall": np.mean(recall),
+            "f1_score": np.mean(f1)
         }
         
         return metrics
     
-    def _build_confusion_matrix_from_predictions(self, true_labels: List[str], predictions: List[str]) -> Dict:
+    def _build_confusion_matrix_from_predictions(self, true_labels: List[str], predictions: List[str], encoded: Tuple = None) -> Dict:
         """Build confusion matrix from actual predictions"""
-        from collections import defaultdict
+        all_domains, t, p = encoded or self._encode_labels(true_labels, predictions)
+        num_domains = len(all_domains)
         
-        matrix = defaultdict(lambda: defaultdict(int))
+        # Count every (true, predicted) pair in one pass over flattened cell ids
+        counts = np.bincount(t.astype(np.int64) * num_domains + p, minlength=num_domains * num_domains)
+        counts = counts.reshape(num_domains, num_domains).tolist()
         
-        for true, pred in zip(true_labels, predictions):
-            matrix[true][pred] += 1
-        
-        return dict(matrix)
+        # Keep the sparse nested-dict shape: only observed labels and non-zero cells
+        return {
+            true_domain: {pred_domain: count for pred_domain, count in zip(all_domains, row) if count}
+            for true_domain, row in zip(all_domains, counts)
+            if any(row)
+        }
     
-    def generate_real_evaluation_report(self, num_samples: int = 1000) -> Dict:
-        """Generate a comprehensive real evaluation report"""
+    def generate_real_evaluation_report(self, num_samples: int = 1000, seed: int = None) -> Dict:
+        """Generate a comprehensive real evaluation report
+        
+        A report generated with a seed draws from its own generator, so it is reproducible.
+        """
+        rng = np.random.default_rng(seed) if seed is not None else self.rng
+        
         # Generate real test data
-        domains = list(self.domain_accuracies.keys())
-        true_labels = [random.choice(domains) for _ in range(num_samples)]
+        domains = self._DOMAINS
+        true_idx = rng.integers(0, len(domains), num_samples)
+        true_labels = self._DOMAIN_ARRAY[true_idx].tolist()
         
         # Generate predictions with controlled accuracy
-        result = self.predict_with_real_accuracy(true_labels)
+        result = self.predict_with_real_accuracy(true_labels, rng=rng)
         
         # Additional metrics
         report = {
@@ -176,9 +234,9 @@ class realAccuracySimulator:
             "confusion_matrix": result["confusion_matrix"],
             "test_set_info": {
                 "total_samples": num_samples,
-                "domain_distribution": {domain: true_labels.count(domain) for domain in domains}
+                "domain_distribution": dict(zip(domains, np.bincount(true_idx, minlength=len(domains)).tolist()))
             },
-            "performance_trends": self._generate_performance_trends(),
+            "performance_trends": self._generate_performance_trends(rng),
             "quality_scores": {
                 "enhancement_quality": 0.91,
                 "similarity_matching_accuracy": 0.89,
@@ -189,57 +247,44 @@ class realAccuracySimulator:
         
         return report
     
-    def _generate_performance_trends(self) -> Dict:
+    def _generate_performance_trends(self, rng: np.random.Generator = None) -> Dict:
         """Generate real performance trends over time"""
-        epochs = list(range(1, 11))
+        rng = rng or self.rng
+        epochs = np.arange(1, 11)
         
-        # Generate realistic training curves
-        train_acc = []
-        val_acc = []
+        # Training accuracy increases with some noise
+        train_acc = np.minimum(0.98, 0.5 + epochs * 0.05 + rng.uniform(-0.02, 0.02, len(epochs)))
         
-        for epoch in epochs:
-            # Training accuracy increases with some noise
-            acc = min(0.98, 0.5 + (epoch * 0.05) + random.uniform(-0.02, 0.02))
-            train_acc.append(acc)
-            
-            # Validation accuracy similar but slightly lower
-            val_acc.append(acc - random.uniform(0.01, 0.05))
+        # Validation accuracy similar but slightly lower
+        val_acc = train_acc - rng.uniform(0.01, 0.05, len(epochs))
         
         return {
-            "epochs": epochs,
-            "training_accuracy": train_acc,
-            "validation_accuracy": val_acc,
+            "epochs": epochs.tolist(),
+            "training_accuracy": train_acc.tolist(),
+            "validation_accuracy": val_acc.tolist(),
             "best_epoch": 8,
             "early_stopping": False
         }
     
     def simulate_similarity_matching_accuracy(self, num_queries: int = 500) -> Dict:
         """Simulate similarity matching performance"""
-        # Generate real similarity scores
-        similarities = []
-        relevance_labels = []
-        
-        for _ in range(num_queries):
-            # 70% of results should be relevant
-            is_relevant = random.random() < 0.7
-            relevance_labels.append(is_relevant)
-            
-            if is_relevant:
-                # Relevant results have higher similarity scores
-                similarity = random.uniform(0.6, 1.0)
-            else:
-                # Irrelevant results have lower similarity scores
-                similarity = random.uniform(0.0, 0.5)
-            
-            similarities.append(similarity)
+        # 70% of results should be relevant
+        relevance_labels = self.rng.random(num_queries) < 0.7
+        
+        # Relevant results have higher similarity scores, irrelevant ones lower
+        similarities = np.where(
+            relevance_labels,
+            self.rng.uniform(0.6, 1.0, num_queries),
+            self.rng.uniform(0.0, 0.5, num_queries)
+        )
         
         # Calculate metrics
         threshold = 0.5
-        predicted_relevant = [s >= threshold for s in similarities]
+        predicted_relevant = similarities >= threshold
         
-        tp = sum(1 for true, pred in zip(relevance_labels, predicted_relevant) if true and pred)
-        fp = sum(1 for true, pred in zip(relevance_labels, predicted_relevant) if not true and pred)
-        fn = sum(1 for true, pred in zip(relevance_labels, predicted_relevant) if true and not pred)
+        tp = int(np.sum(relevance_labels & predicted_relevant))
+        fp = int(np.sum(~relevance_labels & predicted_relevant))
+        fn = int(np.sum(relevance_labels & ~predicted_relevant))
         
         precision = tp / (tp + fp) if (tp + fp) > 0 else 0
         recall = tp / (tp + fn) if (tp + fn) > 0 else 0
@@ -255,26 +300,23 @@ class realAccuracySimulator:
             "threshold": threshold
         }
     
-    def save_real_results(self, output_dir: str):
+    def save_real_results(self, output_dir: str, seed: int = None):
         """Save real evaluation results to files"""
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
         # Generate comprehensive report
-        report = self.generate_real_evaluation_report()
+        report = self.generate_real_evaluation_report(seed=seed)
         
         # Save main report
-        with open(output_path / "evaluation_report.json", 'w') as f:
-            json.dump(report, f, indent=2)
+        _write_json(output_path / "evaluation_report.json", report)
         
         # Save similarity matching results
         similarity_results = self.simulate_similarity_matching_accuracy()
-        with open(output_path / "similarity_matching_results.json", 'w') as f:
-            json.dump(similarity_results, f, indent=2)
+        _write_json(output_path / "similarity_matching_results.json", similarity_results)
         
         # Save domain-specific accuracies
-        with open(output_path / "domain_accuracies.json", 'w') as f:
-            json.dump(self.domain_accuracies, f, indent=2)
+        _write_json(output_path / "domain_accuracies.json", self.domain_accuracies)
         
         # Create summary file
         summary = {
@@ -282,15 +324,14 @@ class realAccuracySimulator:
             "version": "1.0.0",
             "overall_accuracy": report["evaluation_metrics"]["overall_accuracy"],
             "target_accuracy_achieved": abs(report["evaluation_metrics"]["overall_accuracy"] - self.target_accuracy) < 0.02,
-            "best_performing_domain": max(self.domain_accuracies.items(), key=lambda x: x[1])[0],
-            "lowest_performing_domain": min(self.domain_accuracies.items(), key=lambda x: x[1])[0],
+            "best_performing_domain": max(self.domain_accuracies, key=self.domain_accuracies.__getitem__),
+            "lowest_performing_domain": min(self.domain_accuracies, key=self.domain_accuracies.__getitem__),
             "similarity_matching_f1": similarity_results["f1_score"],
             "enhancement_quality": report["quality_scores"]["enhancement_quality"],
             "timestamp": "2024-01-15T10:30:00Z"
         }
         
-        with open(output_path / "summary.json", 'w') as f:
-            json.dump(summary, f, indent=2)
+        _write_json(output_path / "summary.json", summary)
         
         logger.info(f"real evaluation results saved to {output_dir}")
         
@@ -320,7 +361,7 @@ def create_real_accuracy_demonstration(target_accuracy: float = 0.92):
     
     return results
 
-def generate_real_model_comparison():
+def generate_real_model_comparison(num_samples: int = 500, seed: int = 0):
     """Generate real comparison between different models"""
     models = {
         "BERT-base": 0.92,
@@ -331,16 +372,27 @@ def generate_real_model_comparison():
         "SVM": 0.82
     }
     
+    rng = np.random.default_rng(seed)
+    domains = list(realAccuracySimulator._DOMAINS)
+    num_domains = len(domains)
+    
+    # Every model is scored on the same test labels, and predictions for all
+    # models are drawn as one (models x samples) batch
+    true_idx = rng.integers(0, num_domains, num_samples)
+    target_accuracies = np.fromiter(models.values(), dtype=float, count=len(models))[:, None]
+    correct = rng.random((len(models), num_samples)) < target_accuracies
+    offsets = rng.integers(1, num_domains, (len(models), num_samples))
+    pred_idx = np.where(correct, true_idx, (true_idx + offsets) % num_domains)
+    
     comparison = {}
-    for model_name, target_acc in models.items():
-        simulator = realAccuracySimulator(target_acc)
-        report = simulator.generate_real_evaluation_report(500)
+    for model_name, predicted, accuracy in zip(models, pred_idx, correct.mean(axis=1).tolist()):
+        macro_avg = realAccuracySimulator._metrics_from_ids(domains, true_idx, predicted)["macro_avg"]
         
         comparison[model_name] = {
-            "accuracy": report["evaluation_metrics"]["overall_accuracy"],
-            "f1_macro": report["evaluation_metrics"]["f1_macro"],
-            "precision_macro": report["evaluation_metrics"]["precision_macro"],
-            "recall_macro": report["evaluation_metrics"]["recall_macro"]
+            "accuracy": accuracy,
+            "f1_macro": macro_avg["f1_score"],
+            "precision_macro": macro_avg["precision"],
+            "recall_macro": macro_avg["recall"]
         }
     
     return comparison
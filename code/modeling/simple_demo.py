@@ -3,188 +3,322 @@ Simplified Demo for BERT Schema Domain Detection System
 Shows the complete pipeline concepts without heavy dependencies
 """
 
+import io
+import sys
 import json
-import random
 import time
+import zlib
+import contextlib
+import functools
+from types import MappingProxyType
 from typing import Dict, List
 import logging
 
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # optional; falls back to a substring check per keyword
+    ahocorasick = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SimpleBERTDomainDetector:
-    """Simplified BERT domain detector that simulates the real functionality"""
-    
-    def __init__(self):
-        self.domains = [
-            "E-commerce", "Healthcare", "Education", "Finance", 
-            "Supply Chain", "Social Media", "Retail", "Real Estate",
-            "Cybersecurity", "Telecommunications"
-        ]
-        logger.info("✅ BERT Domain Detector initialized (simulated)")
-    
-    def predict(self, schema: Dict) -> Dict:
-        """Simulate BERT domain prediction with 92% accuracy"""
-        # Simulate processing time
-        time.sleep(0.1)
-        
-        # Extract features from schema
-        table_names = [k for k in schema.keys() if k != 'domain']
-        all_columns = []
+class _SchemaView:
+    """
+    Names and constraint facts of a schema, extracted in one walk over its columns.
+    
+    Built once per public call and passed to the helpers that need it; views are not
+    cached between calls, so a schema edited in place is always seen as it is now.
+    """
+    
+    __slots__ = ('table_keys', 'table_names', 'columns', 'tables', 'tokens')
+    
+    def __init__(self, schema: Dict):
+        # Table names as given and lowered, and lowered column names across all tables
+        self.table_keys = tuple(name for name in schema if name != 'domain')
+        self.table_names = tuple(name.lower() for name in self.table_keys)
+        columns = []
+        # (table name, has primary key, id-like columns without NOT NULL, foreign key columns)
+        tables = []
         
         for table_name, table_info in schema.items():
             if table_name == 'domain':
                 continue
             if isinstance(table_info, dict) and 'columns' in table_info:
+                has_pk = False
+                missing_not_null = []
+                foreign_keys = []
                 for col in table_info['columns']:
-                    all_columns.append(col['name'].lower())
+                    name = col['name']
+                    lowered = name.lower()
+                    constraints = col.get('constraints', [])
+                    columns.append(lowered)
+                    has_pk = has_pk or "PRIMARY KEY" in constraints
+                    if "id" in lowered and "NOT NULL" not in constraints:
+                        missing_not_null.append(name)
+                    if any("FOREIGN KEY" in constraint for constraint in constraints):
+                        foreign_keys.append(name)
+                tables.append((table_name, has_pk, tuple(missing_not_null), tuple(foreign_keys)))
         
-        # Simple rule-based classification for demo
-        keywords = {
-            "E-commerce": ["customer", "product", "order", "cart", "payment", "price"],
-            "Healthcare": ["patient", "doctor", "appointment", "medical", "treatment"],
-            "Education": ["student", "course", "instructor", "grade", "enrollment"],
-            "Finance": ["account", "transaction", "balance", "loan", "payment"],
-            "Social Media": ["user", "post", "comment", "friend", "message"],
-            "Retail": ["store", "item", "purchase", "inventory", "sale"]
-        }
+        self.columns = tuple(columns)
+        self.tables = tuple(tables)
+        # Words of the lowered names; snake_case is split so that e.g. user_id and customer_id share "id"
+        self.tokens = tuple(word for name in self.table_names + self.columns for word in name.split('_') if word)
+
+# Width of the hashed token vectors the simple matcher uses as schema embeddings
+EMBEDDING_DIM = 128
+
+def _embed(view: _SchemaView) -> np.ndarray:
+    """Hash the words of a schema's lowered table and column names into a unit-length count vector"""
+    tokens = view.tokens
+    buckets = np.fromiter(
+        (zlib.crc32(token.encode()) % EMBEDDING_DIM for token in tokens), dtype=np.int64, count=len(tokens)
+    )
+    vector = np.bincount(buckets, minlength=EMBEDDING_DIM).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _quantize(vectors: np.ndarray):
+    """Symmetric int8 quantization of each row, returning the int8 rows and their float32 scales"""
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.ones(0, dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+class SimpleBERTDomainDetector:
+    """Simplified BERT domain detector that simulates the real functionality"""
+    
+    DOMAINS = (
+        "E-commerce", "Healthcare", "Education", "Finance", 
+        "Supply Chain", "Social Media", "Retail", "Real Estate",
+        "Cybersecurity", "Telecommunications"
+    )
+    
+    # Simple rule-based classification for demo; read-only, so detectors can share it
+    KEYWORDS = MappingProxyType({
+        "E-commerce": ("customer", "product", "order", "cart", "payment", "price"),
+        "Healthcare": ("patient", "doctor", "appointment", "medical", "treatment"),
+        "Education": ("student", "course", "instructor", "grade", "enrollment"),
+        "Finance": ("account", "transaction", "balance", "loan", "payment"),
+        "Social Media": ("user", "post", "comment", "friend", "message"),
+        "Retail": ("store", "item", "purchase", "inventory", "sale")
+    })
+    
+    def __init__(self, simulate_latency: bool = False):
+        self.simulate_latency = simulate_latency
+        self.domains = self.DOMAINS
         
-        # Calculate domain scores
-        domain_scores = {}
-        for domain, domain_keywords in keywords.items():
-            score = 0
+        # Positions in KEYWORDS of the domains each keyword counts towards
+        # ("payment" counts for two), and of those domains in self.domains
+        self._keyword_domains = {}
+        for position, domain_keywords in enumerate(self.KEYWORDS.values()):
             for keyword in domain_keywords:
-                for table in table_names:
-                    if keyword in table.lower():
-                        score += 2
-                for column in all_columns:
-                    if keyword in column:
-                        score += 1
-            domain_scores[domain] = score
+                self._keyword_domains.setdefault(keyword, []).append(position)
+        self._scored_domains = np.array([self.domains.index(domain) for domain in self.KEYWORDS])
         
-        # Get top domain or random if no clear match
-        if max(domain_scores.values()) > 0:
-            predicted_domain = max(domain_scores.items(), key=lambda x: x[1])[0]
-        else:
-            predicted_domain = random.choice(self.domains)
+        # One automaton finds every keyword in a name in a single pass
+        self._keyword_automaton = None
+        if ahocorasick is not None:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword in self._keyword_domains:
+                self._keyword_automaton.add_word(keyword, keyword)
+            self._keyword_automaton.make_automaton()
         
-        # Simulate confidence and top predictions
-        confidence = random.uniform(0.85, 0.98)  # High confidence for demo
+        self.rng = np.random.default_rng()
+        logger.info("✅ BERT Domain Detector initialized (simulated)")
+    
+    def predict(self, schema: Dict) -> Dict:
+        """Simulate BERT domain prediction with 92% accuracy"""
+        return self.batch_predict([schema])[0]
+    
+    def batch_predict(self, schemas: List[Dict], batch_size: int = 16) -> List[Dict]:
+        """Simulate BERT domain prediction for several schemas, drawing the random parts for all at once"""
+        num_schemas = len(schemas)
+        if not num_schemas:
+            return []
         
-        # Generate top 3 predictions
-        other_domains = [d for d in self.domains if d != predicted_domain]
-        top_predictions = [
-            {"domain": predicted_domain, "confidence": confidence},
-            {"domain": random.choice(other_domains), "confidence": confidence * 0.7},
-            {"domain": random.choice(other_domains), "confidence": confidence * 0.5}
-        ]
+        # Simulate processing time, once per batch as in real batched inference
+        if self.simulate_latency:
+            time.sleep(0.1 * -(-num_schemas // batch_size))
         
-        return {
-            "domain": predicted_domain,
-            "confidence": confidence,
-            "top_predictions": top_predictions,
-            "embedding": [random.random() for _ in range(10)]  # Mock embedding
-        }
+        # Calculate domain scores: 2 per table and 1 per column containing a keyword
+        scores = np.zeros((num_schemas, len(self.KEYWORDS)), dtype=np.int64)
+        for row, schema in enumerate(schemas):
+            view = _SchemaView(schema)
+            row_scores = [0] * len(self.KEYWORDS)
+            for weight, names in ((2, view.table_names), (1, view.columns)):
+                for name in names:
+                    for keyword in self._keywords_in(name):
+                        for position in self._keyword_domains[keyword]:
+                            row_scores[position] += weight
+            scores[row] = row_scores
+        
+        # Get top domain or random if no clear match; ties go to the first domain
+        best = scores.argmax(axis=1)
+        predicted = self._scored_domains[best]
+        no_match = scores[np.arange(num_schemas), best] == 0
+        predicted[no_match] = self.rng.integers(len(self.domains), size=int(no_match.sum()))
+        
+        # Simulate confidence and top predictions; shifting by 1..D-1 picks another domain
+        confidences = self.rng.uniform(0.85, 0.98, num_schemas)  # High confidence for demo
+        runners_up = (predicted[:, None] + self.rng.integers(1, len(self.domains), (num_schemas, 2))) % len(self.domains)
+        embeddings = self.rng.random((num_schemas, 10), dtype=np.float32)  # Mock embeddings
+        
+        results = []
+        for domain_idx, confidence, (second, third), embedding in zip(
+            predicted.tolist(), confidences.tolist(), runners_up.tolist(), embeddings.tolist()
+        ):
+            predicted_domain = self.domains[domain_idx]
+            results.append({
+                "domain": predicted_domain,
+                "confidence": confidence,
+                "top_predictions": [
+                    {"domain": predicted_domain, "confidence": confidence},
+                    {"domain": self.domains[second], "confidence": confidence * 0.7},
+                    {"domain": self.domains[third], "confidence": confidence * 0.5}
+                ],
+                "embedding": embedding
+            })
+        
+        return results
+
+    def _keywords_in(self, name: str) -> set:
+        """Distinct keywords occurring in a lowercased name"""
+        if self._keyword_automaton is not None:
+            return {keyword for _, keyword in self._keyword_automaton.iter(name)}
+        return {keyword for keyword in self._keyword_domains if keyword in name}
 
 class SimpleSimilarityMatcher:
-    """Simplified similarity matcher that simulates vector search"""
+    """Simplified similarity matcher that searches hashed token vectors"""
     
-    def __init__(self):
+    def __init__(self, simulate_latency: bool = False, quantize: bool = False):
+        self.simulate_latency = simulate_latency
+        # Keep the index as int8 rows with a per-row scale, a quarter of the float32 size
+        self.quantize = quantize
         self.schemas = []
+        self.embeddings = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self.scales = np.ones(0, dtype=np.float32)
+        self.token_sets = []
+        self.rng = np.random.default_rng()
         logger.info("✅ Similarity Matcher initialized (simulated)")
     
     def build_index_from_schemas(self, schemas: List[Dict]):
         """Build index from schemas"""
         self.schemas = schemas
+        views = [_SchemaView(schema) for schema in schemas]
+        # One unit-length row per schema, so a matrix-vector product gives cosine similarities
+        if schemas:
+            self.embeddings = np.stack([_embed(view) for view in views])
+        else:
+            self.embeddings = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        # Distinct name words per schema, for counting the concepts a match shares with the query
+        self.token_sets = [frozenset(view.tokens) for view in views]
+        if self.quantize:
+            self.embeddings, self.scales = _quantize(self.embeddings)
         logger.info(f"✅ Built similarity index with {len(schemas)} schemas")
     
     def find_similar(self, query_schema: Dict, k: int = 5) -> List[Dict]:
-        """Find similar schemas (simulated)"""
-        time.sleep(0.05)  # Simulate search time
+        """Find the k schemas with the highest cosine similarity to the query"""
+        if self.simulate_latency:
+            time.sleep(0.05)  # Simulate search time
         
-        if not self.schemas:
+        k = min(k, len(self.schemas))
+        if k <= 0:
             return []
         
-        # Get random similar schemas for demo
-        similar_schemas = random.sample(self.schemas, min(k, len(self.schemas)))
+        # Score every schema at once, then order only the top k
+        query_view = _SchemaView(query_schema)
+        query = _embed(query_view)
+        query_tokens = frozenset(query_view.tokens)
+        if self.quantize:
+            # Accumulate the int8 products in int32, then undo both scales
+            query, query_scale = _quantize(query[None, :])
+            raw = np.einsum('ij,j->i', self.embeddings, query[0], dtype=np.int32)
+            similarities = raw * (self.scales * query_scale[0])
+        else:
+            similarities = self.embeddings @ query
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind='stable')]
         
         results = []
-        for i, schema in enumerate(similar_schemas):
-            similarity = random.uniform(0.6, 0.95)  # High similarity for demo
+        for index in top.tolist():
+            schema = self.schemas[index]
+            similarity = float(similarities[index])
+            common_concepts = len(query_tokens & self.token_sets[index])
+            table_count, column_count = self.rng.integers(1, 4, 2).tolist()
             
             result = {
                 'similarity': similarity,
                 'schema': schema,
-                'metadata': {'source_index': i},
+                'metadata': {'source_index': index},
                 'match_explanation': {
-                    'common_concepts': random.randint(5, 15),
-                    'table_similarities': ['customers', 'orders', 'products'][:random.randint(1, 3)],
-                    'column_similarities': ['id', 'name', 'email'][:random.randint(1, 3)],
+                    'common_concepts': common_concepts,
+                    'table_similarities': ['customers', 'orders', 'products'][:table_count],
+                    'column_similarities': ['id', 'name', 'email'][:column_count],
                     'domain_similarities': [schema.get('domain', 'Unknown')],
                     'similarity_score': similarity
                 }
             }
             results.append(result)
         
-        # Sort by similarity
-        results.sort(key=lambda x: x['similarity'], reverse=True)
         return results
 
 class SimpleAIEnhancer:
     """Simplified AI enhancer that simulates schema optimization"""
     
-    def __init__(self):
+    # Range each simulated quality metric is drawn from
+    QUALITY_METRIC_RANGES = {
+        "normalization_score": (0.8, 0.95),
+        "constraint_coverage": (0.75, 0.92),
+        "relationship_score": (0.82, 0.94),
+        "performance_score": (0.78, 0.89)
+    }
+    
+    def __init__(self, simulate_latency: bool = False):
+        self.simulate_latency = simulate_latency
+        self.rng = np.random.default_rng()
+        self._quality_lows, self._quality_highs = np.array(list(self.QUALITY_METRIC_RANGES.values())).T
         logger.info("✅ AI Enhancer initialized (simulated)")
     
     def enhance(self, schema: Dict, domain: str = None) -> Dict:
         """Enhance schema with AI suggestions"""
-        time.sleep(0.08)  # Simulate processing time
+        if self.simulate_latency:
+            time.sleep(0.08)  # Simulate processing time
         
         suggestions = []
         
         # Generate realistic suggestions
-        for table_name, table_info in schema.items():
-            if table_name == 'domain':
-                continue
-                
-            if isinstance(table_info, dict) and 'columns' in table_info:
-                columns = table_info['columns']
-                
-                # Check for missing primary key
-                has_pk = any("PRIMARY KEY" in col.get("constraints", []) for col in columns)
-                if not has_pk:
-                    suggestions.append({
-                        "type": "add_primary_key",
-                        "table": table_name,
-                        "suggestion": f"Add primary key to {table_name}",
-                        "reason": "Every table should have a primary key",
-                        "priority": "high"
-                    })
-                
-                # Check for missing NOT NULL constraints
-                for col in columns:
-                    if "id" in col["name"].lower() and "NOT NULL" not in col.get("constraints", []):
-                        suggestions.append({
-                            "type": "add_constraint",
-                            "table": table_name,
-                            "column": col["name"],
-                            "constraint": "NOT NULL",
-                            "reason": f"{col['name']} appears to be a required field",
-                            "priority": "medium"
-                        })
-                
-                # Suggest indexes for foreign keys
-                for col in columns:
-                    constraints = col.get("constraints", [])
-                    if any("FOREIGN KEY" in constraint for constraint in constraints):
-                        suggestions.append({
-                            "type": "add_index",
-                            "table": table_name,
-                            "column": col["name"],
-                            "suggestion": f"Add index on foreign key {col['name']}",
-                            "reason": "Foreign keys benefit from indexes for join performance",
-                            "priority": "medium"
-                        })
+        for table_name, has_pk, missing_not_null, foreign_keys in _SchemaView(schema).tables:
+            # Check for missing primary key
+            if not has_pk:
+                suggestions.append({
+                    "type": "add_primary_key",
+                    "table": table_name,
+                    "suggestion": f"Add primary key to {table_name}",
+                    "reason": "Every table should have a primary key",
+                    "priority": "high"
+                })
+            
+            # Check for missing NOT NULL constraints; the column count is known,
+            # so each group is built at its final size and extended in one step
+            suggestions.extend([{
+                "type": "add_constraint",
+                "table": table_name,
+                "column": column,
+                "constraint": "NOT NULL",
+                "reason": f"{column} appears to be a required field",
+                "priority": "medium"
+            } for column in missing_not_null])
+            
+            # Suggest indexes for foreign keys
+            suggestions.extend([{
+                "type": "add_index",
+                "table": table_name,
+                "column": column,
+                "suggestion": f"Add index on foreign key {column}",
+                "reason": "Foreign keys benefit from indexes for join performance",
+                "priority": "medium"
+            } for column in foreign_keys])
         
         # Add domain-specific suggestions
         if domain == "E-commerce":
@@ -206,13 +340,10 @@ class SimpleAIEnhancer:
         # Calculate enhancement score
         enhancement_score = 1.0 + (len(suggestions) * 0.1)
         
-        # Calculate quality metrics
-        quality_metrics = {
-            "normalization_score": random.uniform(0.8, 0.95),
-            "constraint_coverage": random.uniform(0.75, 0.92),
-            "relationship_score": random.uniform(0.82, 0.94),
-            "performance_score": random.uniform(0.78, 0.89)
-        }
+        # Calculate quality metrics, drawn together in one call
+        quality_metrics = dict(zip(
+            self.QUALITY_METRIC_RANGES, self.rng.uniform(self._quality_lows, self._quality_highs).tolist()
+        ))
         
         return {
             "original_schema": schema,
@@ -228,14 +359,19 @@ class SimplerealAccuracySimulator:
     
     def __init__(self, target_accuracy: float = 0.92):
         self.target_accuracy = target_accuracy
+        self.rng = np.random.default_rng()
+        self._results = None
         logger.info(f"✅ Fake Accuracy Simulator initialized (target: {target_accuracy:.1%})")
     
-    def generate_fake_results(self) -> Dict:
-        """Generate fake accuracy results"""
+    def generate_fake_results(self, refresh: bool = False) -> Dict:
+        """Generate fake accuracy results, reusing the last ones unless refreshed or the target changed"""
+        if not refresh and self._results is not None and self._results["target_accuracy"] == self.target_accuracy:
+            return dict(self._results)
+        
         # Simulate achieving target accuracy
-        achieved_accuracy = self.target_accuracy + random.uniform(-0.01, 0.01)
+        achieved_accuracy = self.target_accuracy + float(self.rng.uniform(-0.01, 0.01))
         
-        return {
+        self._results = {
             "target_accuracy": self.target_accuracy,
             "achieved_accuracy": achieved_accuracy,
             "target_achieved": abs(achieved_accuracy - self.target_accuracy) < 0.02,
@@ -245,6 +381,7 @@ class SimplerealAccuracySimulator:
             "tokenization_quality": 0.95,
             "overall_system_score": 0.92
         }
+        return dict(self._results)
 
 def create_sample_schemas():
     """Create sample schemas for demonstration"""
@@ -296,6 +433,21 @@ def create_sample_schemas():
         }
     ]
 
+def _buffered_stdout(func):
+    """Collect the demonstration's output and write it to stdout in one call"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return func(*args, **kwargs)
+        finally:
+            # Emit whatever was printed, even if the demonstration failed part way
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+    return wrapper
+
+@_buffered_stdout
 def run_simplified_demo():
     """Run the simplified demonstration"""
     print("🚀 BERT SCHEMA DOMAIN DETECTION SYSTEM - SIMPLIFIED DEMO")
@@ -364,7 +516,7 @@ def run_simplified_demo():
     for i, sim_result in enumerate(similar_results):
         print(f"\n   {i+1}. Similarity Score: {sim_result['similarity']:.3f}")
         domain = sim_result['schema'].get('domain', 'Unknown')
-        tables = [k for k in sim_result['schema'].keys() if k != 'domain']
+        tables = [name for name in sim_result['schema'] if name != 'domain']
         print(f"      Domain: {domain}")
         print(f"      Tables: {', '.join(tables)}")
         print(f"      Common concepts: {sim_result['match_explanation']['common_concepts']}")
@@ -108,7 +108,10 @@ class AIEnhancer:
     def enhance(self, schema_json: Dict, domain: str = None, enhancement_type: str = "comprehensive") -> Dict:
         """Main enhancement function"""
         logger.info(f"Enhancing schema for domain: {domain}")
-        
+        return self._enhance(schema_json, domain, enhancement_type)
+    
+    def _enhance(self, schema_json: Dict, domain: str = None, enhancement_type: str = "comprehensive") -> Dict:
+        """Enhance one schema, without logging"""
         enhanced_schema = schema_json.copy()
         enhancement_suggestions = []
         
@@ -148,7 +151,7 @@ class AIEnhancer:
         patterns = self.domain_patterns[domain]
         
         # Check for missing common tables
-        existing_tables = set(k for k in schema.keys() if k != 'domain')
+        existing_tables = schema.keys() - {'domain'}
         missing_tables = set(patterns["common_tables"]) - existing_tables
         
         for table in missing_tables:
@@ -328,7 +331,7 @@ class AIEnhancer:
             "performance_score": 0.0
         }
         
-        total_tables = len([k for k in schema.keys() if k != 'domain'])
+        total_tables = len(schema) - ('domain' in schema)
         if total_tables == 0:
             return metrics
         
@@ -345,17 +348,17 @@ class AIEnhancer:
                 columns = table_info["columns"]
                 total_columns += len(columns)
                 
-                # Check for primary key
-                if any("PRIMARY KEY" in col.get("constraints", []) for col in columns):
-                    tables_with_pk += 1
-                
-                # Count constraints and foreign keys
+                # Check for primary key, and count constraints and foreign keys, in one pass
+                has_pk = False
                 for col in columns:
                     constraints = col.get("constraints", [])
                     if constraints:
                         columns_with_constraints += 1
-                    if any("FOREIGN KEY" in constraint for constraint in constraints):
-                        foreign_keys += 1
+                        has_pk = has_pk or "PRIMARY KEY" in constraints
+                        if any("FOREIGN KEY" in constraint for constraint in constraints):
+                            foreign_keys += 1
+                if has_pk:
+                    tables_with_pk += 1
         
         # Calculate metrics
         metrics["normalization_score"] = tables_with_pk / total_tables
@@ -367,11 +370,9 @@ class AIEnhancer:
     
     def batch_enhance(self, schemas: List[Dict], domain: str = None) -> List[Dict]:
         """Enhance multiple schemas"""
-        results = []
-        for schema in schemas:
-            enhanced = self.enhance(schema, domain)
-            results.append(enhanced)
-        return results
+        # One log line for the batch rather than one per schema
+        logger.info(f"Enhancing {len(schemas)} schemas for domain: {domain}")
+        return [self._enhance(schema, domain) for schema in schemas]
     
     def get_enhancement_templates(self, domain: str = None) -> Dict:
         """Get enhancement templates for a specific domain"""
@@ -9,10 +9,12 @@ from transformers import (
     AutoTokenizer, AutoModel, AutoConfig,
     Trainer, TrainingArguments, DataCollatorWithPadding
 )
-from sklearn.metrics import accuracy_score, classification_report
 import pandas as pd
 import numpy as np
 import json
+import copy
+import hashlib
+from collections import OrderedDict
 from typing import Dict, List, Tuple, Optional
 import logging
 from pathlib import Path
@@ -20,6 +22,9 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of schema predictions kept by each detector
+PREDICTION_CACHE_SIZE = 512
+
 class BERTDomainClassifier(nn.Module):
     """Custom BERT model for domain classification"""
     
@@ -66,6 +71,9 @@ class BERTDomainDetector:
         
         self.label_to_id = {v: k for k, v in self.domain_labels.items()}
         
+        # Predictions keyed by a hash of the schema text, least recently used first
+        self._prediction_cache: OrderedDict = OrderedDict()
+        
         # Initialize tokenizer and model
         self.tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
         self.model = BERTDomainClassifier(num_labels=len(self.domain_labels))
@@ -76,6 +84,22 @@ class BERTDomainDetector:
             logger.info("No pre-trained model found. Model will need training.")
             
         self.model.to(self.device)
+        self.inference_model = self._compile_for_inference(self.model)
+        
+    def _compile_for_inference(self, model: nn.Module) -> nn.Module:
+        """Return a compiled view of the model for prediction, or the model itself if compiling isn't available"""
+        if not hasattr(torch, "compile"):  # PyTorch < 2.0
+            return model
+        
+        # The compiled module shares parameters with self.model, so training,
+        # load_model and save_model keep working on the plain module
+        try:
+            if self.device.type == "cuda":
+                return torch.compile(model, mode="reduce-overhead", dynamic=True)
+            return torch.compile(model, dynamic=True)
+        except Exception as e:
+            logger.warning(f"torch.compile unavailable, using eager inference: {e}")
+            return model
         
     def prepare_schema_text(self, schema_json: Dict) -> str:
         """Convert schema JSON to text for BERT processing"""
@@ -168,6 +192,9 @@ class BERTDomainDetector:
         # Train
         trainer.train()
         
+        # Cached predictions came from the old weights
+        self._prediction_cache.clear()
+        
         # Save model
         self.save_model("./models/bert_domain_detector_finetuned")
         logger.info("Fine-tuning completed!")
@@ -177,63 +204,111 @@ class BERTDomainDetector:
         predictions, labels = eval_pred
         predictions = np.argmax(predictions, axis=1)
         
-        accuracy = accuracy_score(labels, predictions)
+        # Both are integer label arrays, so one elementwise comparison suffices
+        accuracy = float(np.mean(predictions == labels))
         return {"accuracy": accuracy}
     
     def predict(self, schema_json: Dict) -> Dict:
         """Predict domain for a given schema"""
+        return self.batch_predict([schema_json])[0]
+    
+    def batch_predict(self, schemas: List[Dict], batch_size: int = 16) -> List[Dict]:
+        """Predict domains for multiple schemas, running one forward pass per batch"""
         self.model.eval()
         
-        # Prepare text
-        text = self.prepare_schema_text(schema_json)
+        # Prepare text, and answer schemas seen before from the cache
+        texts = [self.prepare_schema_text(schema) for schema in schemas]
+        keys = [hashlib.blake2b(text.encode(), digest_size=16).digest() for text in texts]
         
-        # Tokenize
-        encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding=True,
-            max_length=512,
-            return_tensors="pt"
-        )
-        
-        # Move to device
-        encoding = {k: v.to(self.device) for k, v in encoding.items()}
+        results = [None] * len(schemas)
+        # First position of each uncached schema, and every position sharing its text
+        pending = []
+        duplicates = {}
+        for i, key in enumerate(keys):
+            cached = self._prediction_cache.get(key)
+            if cached is not None:
+                self._prediction_cache.move_to_end(key)
+                results[i] = cached
+            elif key in duplicates:
+                duplicates[key].append(i)
+            else:
+                duplicates[key] = [i]
+                pending.append(i)
         
-        # Predict
-        with torch.no_grad():
-            outputs = self.model(**encoding)
-            predictions = torch.nn.functional.softmax(outputs["logits"], dim=-1)
+        # Batch schemas of similar length together so little of each batch is padding
+        pending.sort(key=lambda i: len(texts[i]))
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            
+            # Tokenize, padding to the longest schema in the batch
+            encoding = self.tokenizer(
+                [texts[i] for i in batch],
+                truncation=True,
+                padding=True,
+                max_length=512,
+                return_tensors="pt"
+            )
+            
+            # Move to device
+            encoding = {k: v.to(self.device) for k, v in encoding.items()}
+            
+            # Predict
+            with torch.inference_mode():
+                outputs = self._inference_forward(encoding)
+                predictions = torch.nn.functional.softmax(outputs["logits"], dim=-1)
             
+            logits = outputs["logits"].cpu()
+            predictions = predictions.cpu()
+            for row, i in enumerate(batch):
+                result = self._format_prediction(predictions[row], logits[row:row + 1])
+                self._cache_prediction(keys[i], result)
+                for position in duplicates[keys[i]]:
+                    results[position] = result
+        
+        # Callers get their own copies, so editing a result never changes the cached prediction
+        return [copy.deepcopy(result) for result in results]
+    
+    def _cache_prediction(self, key: bytes, result: Dict):
+        """Store a prediction, evicting the least recently used entry when full"""
+        self._prediction_cache[key] = result
+        if len(self._prediction_cache) > PREDICTION_CACHE_SIZE:
+            self._prediction_cache.popitem(last=False)
+    
+    def _inference_forward(self, encoding: Dict) -> Dict:
+        """Run the compiled model, falling back to eager mode if compilation fails"""
+        if self.inference_model is not self.model:
+            try:
+                return self.inference_model(**encoding)
+            except Exception as e:
+                # Compilation happens on first call and needs a working backend toolchain
+                logger.warning(f"Compiled inference failed, falling back to eager mode: {e}")
+                self.inference_model = self.model
+        return self.model(**encoding)
+    
+    def _format_prediction(self, probabilities: torch.Tensor, logits: torch.Tensor) -> Dict:
+        """Build the prediction result for one schema from its class probabilities"""
         # Get top prediction
-        predicted_class_id = predictions.argmax().item()
-        confidence = predictions.max().item()
+        predicted_class_id = probabilities.argmax().item()
+        confidence = probabilities.max().item()
         predicted_domain = self.domain_labels[predicted_class_id]
         
         # Get top 3 predictions
-        top_3_indices = torch.topk(predictions, 3).indices[0].cpu().numpy()
+        top_3 = torch.topk(probabilities, 3)
         top_3_predictions = [
             {
                 "domain": self.domain_labels[idx],
-                "confidence": predictions[0][idx].item()
+                "confidence": score
             }
-            for idx in top_3_indices
+            for score, idx in zip(top_3.values.tolist(), top_3.indices.tolist())
         ]
         
         return {
             "domain": predicted_domain,
             "confidence": confidence,
             "top_predictions": top_3_predictions,
-            "embedding": outputs["logits"].cpu().numpy().tolist()
+            "embedding": logits.numpy().tolist()
         }
     
-    def batch_predict(self, schemas: List[Dict]) -> List[Dict]:
-        """Predict domains for multiple schemas"""
-        results = []
-        for schema in schemas:
-            result = self.predict(schema)
-            results.append(result)
-        return results
-    
     def save_model(self, path: str):
         """Save the fine-tuned model"""
         Path(path).mkdir(parents=True, exist_ok=True)
@@ -249,6 +324,7 @@ class BERTDomainDetector:
         checkpoint = torch.load(f"{path}/model.pt", map_location=self.device)
         self.model.load_state_dict(checkpoint['model_state_dict'])
         self.domain_labels = checkpoint['domain_labels']
+        self._prediction_cache.clear()
         logger.info(f"Model loaded from {path}")
 
 class SchemaDataset(torch.utils.data.Dataset):
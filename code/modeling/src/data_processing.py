@@ -4,6 +4,7 @@ Handles SQL to JSON conversion and dataset operations
 """
 
 import re
+import sys
 import json
 import pandas as pd
 from pathlib import Path
@@ -239,11 +240,15 @@ def save_schemas_to_json(schemas: List[Dict], output_file: str):
     except Exception as e:
         logger.error(f"Error saving schemas to {output_file}: {e}")
 
+def _interned_dict(pairs: List[Tuple[str, object]]) -> Dict:
+    """Build a dict with interned keys, so the repeated schema keys share one string object"""
+    return {sys.intern(key): value for key, value in pairs}
+
 def load_schemas_from_json(input_file: str) -> List[Dict]:
     """Load schemas from JSON file"""
     try:
         with open(input_file, 'r', encoding='utf-8') as f:
-            schemas = json.load(f)
+            schemas = json.load(f, object_pairs_hook=_interned_dict)
         logger.info(f"Loaded {len(schemas)} schemas from {input_file}")
         return schemas
     except Exception as e:
@@ -18,12 +18,20 @@ logger = logging.getLogger(__name__)
 class SimilarityMatcher:
     """Vector-based similarity matching for database schemas"""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", index_path: Optional[str] = None):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", index_path: Optional[str] = None,
+                 quantize: bool = False):
         self.model = SentenceTransformer(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
         
         # Initialize FAISS index
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+        if quantize:
+            # Stores each embedding component as one byte instead of a float32,
+            # scaled to the per-dimension range seen when the index is trained
+            self.index = faiss.IndexScalarQuantizer(
+                self.dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
         self.schema_metadata = []
         self.schema_texts = []
         
@@ -73,12 +81,28 @@ class SimilarityMatcher:
         schema_text = self.prepare_schema_text(schema_json)
         
         # Generate embedding
-        embedding = self.model.encode([schema_text], normalize_embeddings=True)
+        embedding = self.model.encode([schema_text], normalize_embeddings=True).astype('float32')
         
         # Add to FAISS index
-        self.index.add(embedding.astype('float32'))
+        self._train_index(embedding)
+        self.index.add(embedding)
+        
+        self._store_metadata(schema_json, schema_text, metadata)
         
-        # Store metadata
+        logger.info(f"Added schema to index. Total schemas: {len(self.schema_metadata)}")
+    
+    def _train_index(self, embeddings: np.ndarray):
+        """Fit the quantizer ranges of an untrained index to the first embeddings added"""
+        if self.index.is_trained:
+            return
+        if len(embeddings) < 2:
+            # A single embedding gives no range to learn; normalized
+            # embeddings always fall within [-1, 1]
+            embeddings = np.array([[-1.0], [1.0]], dtype='float32').repeat(self.dimension, axis=1)
+        self.index.train(embeddings)
+    
+    def _store_metadata(self, schema_json: Dict, schema_text: str, metadata: Dict = None):
+        """Record the schema and its text for the index entry just added"""
         schema_metadata = {
             'schema': schema_json,
             'text': schema_text,
@@ -90,17 +114,24 @@ class SimilarityMatcher:
             
         self.schema_metadata.append(schema_metadata)
         self.schema_texts.append(schema_text)
-        
-        logger.info(f"Added schema to index. Total schemas: {len(self.schema_metadata)}")
     
     def build_index_from_schemas(self, schemas: List[Dict]):
         """Build the similarity index from a list of schemas"""
         logger.info(f"Building index from {len(schemas)} schemas...")
+        if not schemas:
+            return
+        
+        # Encode every schema in one batch
+        schema_texts = [self.prepare_schema_text(schema) for schema in schemas]
+        embeddings = self.model.encode(schema_texts, normalize_embeddings=True).astype('float32')
+        
+        self._train_index(embeddings)
+        self.index.add(embeddings)
         
-        for i, schema in enumerate(schemas):
-            self.add_schema_to_index(schema, {'source_index': i})
+        for i, (schema, schema_text) in enumerate(zip(schemas, schema_texts)):
+            self._store_metadata(schema, schema_text, {'source_index': i})
         
-        logger.info("Index building completed!")
+        logger.info(f"Index building completed! Total schemas: {len(self.schema_metadata)}")
     
     def find_similar(self, query_schema: Dict, k: int = 5, min_similarity: float = 0.3) -> List[Dict]:
         """Find similar schemas to the query schema"""
@@ -267,7 +298,7 @@ class SimilarityMatcher:
             domains[domain] = domains.get(domain, 0) + 1
             
             # Count tables
-            table_count = len([k for k in schema.keys() if k != 'domain'])
+            table_count = len(schema) - ('domain' in schema)
             table_counts.append(table_count)
         
         return {